@@ -0,0 +1,193 @@
+import json
+import math
+import os
+import tempfile
+import threading
+
+
+def _quantile(samples, q):
+    """Nearest-rank quantile of an unsorted list"""
+    ordered = sorted(samples)
+    return ordered[max(1, math.ceil(q * len(ordered))) - 1]
+
+
+class DurationModel:
+    """Recent generation times per (model, aspect ratio), persisted to a small JSON file.
+
+    A sample is the time from clicking Generate until every result image was
+    detected. Only the newest `window` samples per key are kept, so the
+    distribution follows Dreamina's current speed.
+
+    Generations that hit the deadline with only some images are right-censored:
+    the true time is longer than what was observed. They are kept apart from
+    the samples (so they never skew the percentiles) and only push the next
+    deadline past the longest one, until a completed generation replaces them.
+    """
+
+    MAX_CENSORED = 5
+
+    def __init__(self, path=None, window=None):
+        self.path = path or os.environ.get('DREAMINA_POLL_STATS_FILE', '/tmp/dreamina_poll_stats.json')
+        self.window = window or int(os.environ.get('DREAMINA_POLL_STATS_WINDOW', 50))
+        self._lock = threading.Lock()
+        self._samples, self._censored = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}, {}
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable poll stats file {self.path}: {e}")
+            return {}, {}
+        if not isinstance(data, dict):
+            return {}, {}
+        if 'samples' not in data:
+            # Older files held only the samples
+            return data, {}
+        return data.get('samples') or {}, data.get('censored') or {}
+
+    def _save(self):
+        directory = os.path.dirname(self.path) or '.'
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.poll-stats-')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'samples': self._samples, 'censored': self._censored}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Could not save poll stats: {e}")
+
+    @staticmethod
+    def _key(model, aspect_ratio):
+        return f'{model}|{aspect_ratio}'
+
+    def record(self, model, aspect_ratio, seconds):
+        with self._lock:
+            key = self._key(model, aspect_ratio)
+            samples = self._samples.setdefault(key, [])
+            samples.append(round(seconds, 2))
+            del samples[:-self.window]
+            self._censored.pop(key, None)
+            self._save()
+
+    def record_censored(self, model, aspect_ratio, seconds):
+        """A generation still unfinished after `seconds`; its real duration is longer"""
+        with self._lock:
+            censored = self._censored.setdefault(self._key(model, aspect_ratio), [])
+            censored.append(round(seconds, 2))
+            del censored[:-self.MAX_CENSORED]
+            self._save()
+
+    def censored(self, model, aspect_ratio):
+        with self._lock:
+            return list(self._censored.get(self._key(model, aspect_ratio), []))
+
+    def samples(self, model, aspect_ratio):
+        """Samples for this model and aspect ratio, or for the model across all aspect ratios if too few"""
+        with self._lock:
+            exact = list(self._samples.get(self._key(model, aspect_ratio), []))
+            if len(exact) >= PollSchedule.MIN_SAMPLES:
+                return exact
+            pooled = [s for key, values in self._samples.items() if key.split('|')[0] == model for s in values]
+            return pooled if len(pooled) > len(exact) else exact
+
+    def snapshot(self):
+        with self._lock:
+            keys = list(dict.fromkeys(list(self._samples) + list(self._censored)))
+        report = {}
+        for key in keys:
+            model, aspect_ratio = key.split('|', 1)
+            schedule = PollSchedule.for_generation(self, model, aspect_ratio)
+            with self._lock:
+                samples = list(self._samples.get(key, []))
+                censored = list(self._censored.get(key, []))
+            report[key] = {
+                'samples': len(samples),
+                'censored': censored,
+                'p50': _quantile(samples, 0.5) if samples else None,
+                'p90': _quantile(samples, 0.9) if samples else None,
+                'dense_window': [schedule.dense_from, schedule.dense_until],
+                'deadline': schedule.deadline
+            }
+        return report
+
+
+class PollSchedule:
+    """When to check for results next, given seconds elapsed since Generate was clicked.
+
+    With enough history, checks are sparse (every max_interval) until shortly
+    before the fastest typical completion (p10), every min_interval from
+    there to p90, then back off gradually. The deadline is a high percentile times a
+    margin, clamped to [min_deadline, max_deadline]. Without history a fixed
+    interval and DREAMINA_POLL_MAX_WAIT are used. Either way the deadline is
+    raised to the longest censored wait times the margin, so a generation that
+    missed the last deadline gets longer next time.
+    """
+
+    MIN_SAMPLES = 5
+
+    def __init__(self, samples=(), censored=(), min_interval=None, max_interval=None, default_interval=None,
+                 default_deadline=None, percentile=None, margin=None, min_deadline=None, max_deadline=None):
+        env = os.environ.get
+        self.min_interval = min_interval or float(env('DREAMINA_POLL_MIN_INTERVAL', 0.5))
+        self.max_interval = max_interval or float(env('DREAMINA_POLL_MAX_INTERVAL', 5))
+        default_interval = default_interval or float(env('DREAMINA_POLL_DEFAULT_INTERVAL', 1))
+        default_deadline = default_deadline or float(env('DREAMINA_POLL_MAX_WAIT', 60))
+        percentile = percentile or float(env('DREAMINA_POLL_DEADLINE_PERCENTILE', 0.95))
+        margin = margin or float(env('DREAMINA_POLL_DEADLINE_MARGIN', 1.3))
+        min_deadline = min_deadline or float(env('DREAMINA_POLL_MIN_DEADLINE', 20))
+        max_deadline = max_deadline or float(env('DREAMINA_POLL_MAX_DEADLINE', 120))
+
+        self.samples = len(samples)
+        if self.samples >= self.MIN_SAMPLES:
+            # Samples are only as precise as the polling that measured them, so start a little early
+            self.dense_from = round(_quantile(samples, 0.1) * 0.8, 2)
+            self.dense_until = _quantile(samples, 0.9)
+            self.deadline = round(min(max_deadline, max(min_deadline, _quantile(samples, percentile) * margin)), 1)
+        else:
+            # No history: check at a steady pace for the whole wait
+            self.dense_from = 0
+            self.dense_until = default_deadline
+            self.min_interval = default_interval
+            self.deadline = default_deadline
+        if censored:
+            self.deadline = round(min(max_deadline, max(self.deadline, max(censored) * margin)), 1)
+
+    @classmethod
+    def for_generation(cls, duration_model, model, aspect_ratio):
+        return cls(duration_model.samples(model, aspect_ratio), duration_model.censored(model, aspect_ratio))
+
+    def next_delay(self, elapsed):
+        """Seconds to wait before the next check; 0 once the deadline has passed"""
+        remaining = self.deadline - elapsed
+        if remaining <= 0:
+            return 0
+        if elapsed < self.dense_from:
+            delay = min(self.max_interval, self.dense_from - elapsed)
+        elif elapsed <= self.dense_until:
+            delay = self.min_interval
+        else:
+            # Slower than usual: back off, but keep checking often enough to be on time
+            delay = min(self.max_interval, max(self.min_interval, (elapsed - self.dense_until) / 4))
+        return min(max(delay, 0.05), remaining)
+
+    def describe(self):
+        if self.samples < self.MIN_SAMPLES:
+            return f"no history, every {self.min_interval}s for up to {self.deadline}s"
+        return (f"{self.samples} samples, dense {self.dense_from}-{self.dense_until}s, "
+                f"deadline {self.deadline}s")
+
+
+_default_model = None
+_lock = threading.Lock()
+
+
+def get_duration_model():
+    """Process-wide DurationModel backed by the file in DREAMINA_POLL_STATS_FILE"""
+    global _default_model
+    with _lock:
+        if _default_model is None:
+            _default_model = DurationModel()
+        return _default_model
@@ -0,0 +1,91 @@
+import math
+import os
+import threading
+from contextlib import contextmanager
+
+import metrics
+
+
+class AdmissionRejected(Exception):
+    """Raised when a generation request can't be admitted; carries the Retry-After hint"""
+
+    def __init__(self, reason, retry_after, estimated_wait):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+        self.estimated_wait = estimated_wait
+
+
+class AdmissionController:
+    """Bounded admission in front of the generate routes.
+
+    Up to `capacity` requests (one per pooled browser) run at once and up to
+    `max_queue` more wait for a browser. Anything beyond that is refused
+    straight away instead of waiting to hit the server timeout. A request is
+    also refused if its estimated wait plus one generation would take longer
+    than `max_wait`. The estimate comes from an exponentially weighted moving
+    average of recent generate_image durations.
+    """
+
+    def __init__(self, capacity, max_queue=None, max_wait=None, alpha=None, initial_estimate=None):
+        self.capacity = max(1, capacity)
+        self.max_queue = int(os.environ.get('ADMISSION_MAX_QUEUE', 4)) if max_queue is None else max_queue
+        self.max_wait = float(os.environ.get('ADMISSION_MAX_WAIT', 150)) if max_wait is None else max_wait
+        self.alpha = alpha or float(os.environ.get('ADMISSION_EWMA_ALPHA', 0.3))
+        self.average_duration = initial_estimate or float(os.environ.get('ADMISSION_INITIAL_ESTIMATE', 40))
+        self._lock = threading.Lock()
+        self._admitted = 0
+        self._accepted = 0
+        self._rejected = {}
+
+    def observe(self, seconds):
+        """Fold one browser generation's duration into the moving average"""
+        with self._lock:
+            self.average_duration += self.alpha * (seconds - self.average_duration)
+
+    def _estimated_wait(self, admitted):
+        # Requests ahead of this one in the queue, drained `capacity` at a time
+        ahead = max(0, admitted - self.capacity + 1)
+        return ahead * self.average_duration / self.capacity
+
+    def _retry_after(self):
+        # Roughly when the next running generation should free a slot
+        return max(1, math.ceil(self.average_duration / self.capacity))
+
+    @contextmanager
+    def admit(self):
+        """Hold an admission slot for the duration of the block, or raise AdmissionRejected"""
+        with self._lock:
+            estimated_wait = self._estimated_wait(self._admitted)
+            reason = None
+            if self._admitted >= self.capacity + self.max_queue:
+                reason = 'queue_full'
+            elif self.max_wait and estimated_wait + self.average_duration > self.max_wait:
+                reason = 'wait_too_long'
+            if reason:
+                self._rejected[reason] = self._rejected.get(reason, 0) + 1
+                retry_after = self._retry_after()
+            else:
+                self._admitted += 1
+                self._accepted += 1
+        if reason:
+            metrics.ADMISSION_REJECTIONS.inc(reason=reason)
+            raise AdmissionRejected(reason, retry_after, round(estimated_wait, 1))
+        try:
+            yield round(estimated_wait, 1)
+        finally:
+            with self._lock:
+                self._admitted -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'capacity': self.capacity,
+                'max_queue': self.max_queue,
+                'running': min(self._admitted, self.capacity),
+                'queued': max(0, self._admitted - self.capacity),
+                'average_duration': round(self.average_duration, 2),
+                'estimated_wait': round(self._estimated_wait(self._admitted), 1),
+                'accepted': self._accepted,
+                'rejected': dict(self._rejected)
+            }
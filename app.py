@@ -1,14 +1,260 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, send_file
 from flask_cors import CORS
+import atexit
+import io
 import os
-from dreamina_service import DreaminaService
+import queue
+import threading
+import time
+from contextlib import ExitStack
+from admission import AdmissionController, AdmissionRejected
+from driver_pool import DriverPool, PoolExhaustedError
+from dreamina_service import IMAGES_PER_GENERATION
+from job_manager import JobManager
+from result_cache import ResultCache, make_key
+from single_flight import SingleFlight
+from tab_scheduler import TabScheduler
+from image_store import ImageStore, ImageNotFoundError
+from image_variants import VariantPipeline
+from sse import KEEPALIVE, GenerationStream
+from selector_stats import get_selector_stats
+from adaptive_polling import get_duration_model
+from resource_blocking import get_resource_blocker
+from debug_store import get_debug_store
+import browser_binaries
+import metrics
+from health import HealthProber, get_health_state
 
 app = Flask(__name__)
 CORS(app)
 
-def init_service():
-    """Create a new service instance for each request to minimize memory usage"""
-    return DreaminaService()
+# Long-lived, logged-in browsers shared across requests (see driver_pool.py)
+service_pool = DriverPool()
+atexit.register(service_pool.close)
+
+# Successful results for repeated (prompt, model, aspect_ratio, quality) requests
+result_cache = ResultCache()
+
+# Concurrent identical requests share one in-flight generation
+generation_flights = SingleFlight()
+
+# Local copies of generated images, served from /api/images/<image_id>
+image_store = ImageStore()
+atexit.register(image_store.close)
+
+# Thumbnails and WebP/AVIF re-encodings of cached images, rendered off the request threads
+variant_pipeline = VariantPipeline(image_store)
+atexit.register(variant_pipeline.close)
+
+# Bounded queue in front of the generate routes; overflow gets 429 + Retry-After
+admission = AdmissionController(service_pool.size)
+
+def admission_rejected_body(e):
+    return {
+        'status': 'error',
+        'message': ('Too many generation requests queued' if e.reason == 'queue_full'
+                    else f'Estimated wait of {e.estimated_wait}s is too long'),
+        'reason': e.reason,
+        'estimated_wait': e.estimated_wait,
+        'retry_after': e.retry_after
+    }
+
+def admission_rejected(e):
+    """429 response for a request refused by admission control"""
+    response = jsonify(admission_rejected_body(e))
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response, 429
+
+def attach_proxied_images(result):
+    """Start caching a successful result's images locally and list their proxy and variant URLs"""
+    if result.get('status') != 'success':
+        return result
+    image_ids = [image_store.register(url) for url in result.get('images', [])]
+    result['proxied_images'] = [f"/api/images/{image_id}" for image_id in image_ids]
+    if variant_pipeline.enabled:
+        for image_id in image_ids:
+            variant_pipeline.submit(image_id)
+        result['variants'] = [
+            {name: f"/api/images/{image_id}/variants/{name}" for name in variant_pipeline.names}
+            for image_id in image_ids
+        ]
+    return result
+
+def cache_requested():
+    """Clients opt out of the result cache with ?cache=false"""
+    return request.args.get('cache', 'true').lower() not in ('false', '0', 'no', 'off')
+
+def parse_min_images(value):
+    """?min_images=N returns as soon as N of the images exist (1-4, default all)"""
+    try:
+        return max(1, min(IMAGES_PER_GENERATION, int(value)))
+    except (TypeError, ValueError):
+        return IMAGES_PER_GENERATION
+
+def flight_key(prompt, aspect_ratio, quality, model, min_images=IMAGES_PER_GENERATION):
+    """Identical concurrent requests share one generation; early returns only share with each other"""
+    key = make_key(prompt, model, aspect_ratio, quality)
+    return key if min_images >= IMAGES_PER_GENERATION else f'{key}:min{min_images}'
+
+def cached_result(prompt, aspect_ratio, quality, model, use_cache=True):
+    """The cached response for this generation, or None (an in-memory lookup, safe on an event loop)"""
+    if not (use_cache and result_cache.enabled):
+        return None
+    cached = result_cache.get(make_key(prompt, model, aspect_ratio, quality))
+    if cached is not None:
+        print(f"⚡ Cache hit for prompt: {prompt[:50]}")
+        cached['cached'] = True
+    return cached
+
+def reserve_browser(prompt, aspect_ratio, quality, model, min_images=IMAGES_PER_GENERATION):
+    """Take an admission slot for a request that will lease a browser, or raise AdmissionRejected.
+    
+    For callers that must answer 429 before handing the work to another thread.
+    Returns an ExitStack holding the slot, or None if an identical generation is
+    already running and the request will just join it. Check the cache first.
+    """
+    if generation_flights.in_flight(flight_key(prompt, aspect_ratio, quality, model, min_images)):
+        return None
+    slot = ExitStack()
+    slot.enter_context(admission.admit())
+    return slot
+
+def run_generation(prompt, aspect_ratio, quality, model, use_cache=True, on_event=None,
+                   min_images=IMAGES_PER_GENERATION, admitted=False):
+    """Run one generation on a pooled browser, answering repeats from the result cache.
+    
+    Only the request that actually leases a browser goes through admission (and
+    may raise AdmissionRejected); cache hits and requests joining an in-flight
+    generation don't. admitted=True means the caller already holds a slot from
+    reserve_browser.
+    """
+    cached = cached_result(prompt, aspect_ratio, quality, model, use_cache)
+    if cached is not None:
+        return cached
+    key = make_key(prompt, model, aspect_ratio, quality)
+    
+    def generate():
+        with ExitStack() as slot:
+            if not admitted:
+                slot.enter_context(admission.admit())
+            with service_pool.lease() as service:
+                started = time.monotonic()
+                result = service.generate_image(
+                    prompt=prompt,
+                    aspect_ratio=aspect_ratio,
+                    quality=quality,
+                    model=model,
+                    on_event=on_event,
+                    min_images=min_images
+                )
+                admission.observe(time.monotonic() - started)
+        attach_proxied_images(result)
+        # Early returns with fewer images than a full generation would answer later repeats short
+        if result.get('status') == 'success' and result.get('count', 0) >= IMAGES_PER_GENERATION:
+            result_cache.put(key, result)
+        return result
+    
+    result, shared = generation_flights.do(flight_key(prompt, aspect_ratio, quality, model, min_images), generate)
+    if shared:
+        print(f"🔗 Joined in-flight generation for prompt: {prompt[:50]}")
+        result['coalesced'] = True
+    return result
+
+def stream_generation(stream, slot, prompt, aspect_ratio, quality, model, use_cache=True,
+                      min_images=IMAGES_PER_GENERATION):
+    """Run one cache-missed generation for an event stream, releasing its slot (from reserve_browser) when it ends"""
+    try:
+        # Looked up once more only when joining: the generation may have finished and filled the cache
+        result = run_generation(prompt, aspect_ratio, quality, model, use_cache=use_cache and slot is None,
+                                on_event=stream.on_event, min_images=min_images, admitted=slot is not None)
+    except AdmissionRejected as e:
+        # The generation this stream meant to join ended first, and a new one couldn't be admitted
+        result = admission_rejected_body(e)
+    except PoolExhaustedError as e:
+        result = {'status': 'error', 'message': f'All browsers are busy: {str(e)}'}
+    except Exception as e:
+        result = {'status': 'error', 'message': f'Image generation failed: {str(e)}'}
+    finally:
+        if slot is not None:
+            slot.close()
+    stream.finish(result)
+
+def queued_generation(slot):
+    """Job runner for a generation whose admission was settled when it was queued.
+    
+    slot comes from reserve_browser and is released when the job ends; None
+    means the job was expected to join an in-flight generation.
+    """
+    def run(job, prompt, aspect_ratio, quality, model, min_images=IMAGES_PER_GENERATION):
+        try:
+            return run_generation(prompt, aspect_ratio, quality, model, use_cache=slot is None,
+                                  min_images=min_images, admitted=slot is not None)
+        finally:
+            if slot is not None:
+                slot.close()
+    return run
+
+def release_when_done(runner, slot):
+    """Wrap a job runner so the admission slot taken when the job was queued is released when it ends"""
+    def run(job, **params):
+        try:
+            return runner(job, **params)
+        finally:
+            slot.close()
+    return run
+
+def run_batch(job, items, max_in_flight=None, tabs=1):
+    """Run a batch job on one pooled browser, publishing each item as it finishes.
+    
+    With tabs > 1 the items are spread over that many tabs of the same browser.
+    """
+    job.items = []
+    with service_pool.lease() as service:
+        scheduler = None
+        if tabs > 1:
+            scheduler = TabScheduler(service, tabs=tabs)
+            scheduler.open()
+            results = scheduler.generate_many(items)
+        else:
+            results = service.generate_batch(items, max_in_flight=max_in_flight)
+        try:
+            for result in results:
+                attach_proxied_images(result)
+                # Only cache images known to belong to this prompt; order-matched ones may be another item's
+                if result['status'] == 'success' and result.get('matched_by') == 'task_id':
+                    spec = items[result['index']]
+                    cached = {k: v for k, v in result.items() if k != 'index'}
+                    result_cache.put(make_key(spec['prompt'], spec['model'], spec['aspect_ratio'], spec['quality']), cached)
+                job.items.append(result)
+        finally:
+            if scheduler:
+                scheduler.close()
+    
+    results = sorted(job.items, key=lambda item: item['index'])
+    succeeded = sum(1 for item in results if item['status'] == 'success')
+    unmatched = sum(1 for item in results if item['status'] == 'unmatched')
+    return {
+        'status': 'success' if succeeded else 'error',
+        'total': len(items),
+        'succeeded': succeeded,
+        'unmatched': unmatched,
+        'failed': len(results) - succeeded - unmatched,
+        'items': results
+    }
+
+# Cached health state, refreshed in the background so /api/health never launches Chrome
+health_state = get_health_state()
+health_prober = HealthProber(health_state, service_pool)
+atexit.register(health_prober.stop)
+
+@app.before_request
+def start_background_threads():
+    # Started on first request rather than at import, since gunicorn --preload forks after importing
+    health_prober.start()
+
+# Background generation jobs; one worker per pooled browser
+job_manager = JobManager(run_generation, max_workers=service_pool.size)
+atexit.register(job_manager.shutdown)
 
 @app.route('/', methods=['GET'])
 def home():
@@ -18,13 +264,22 @@ def home():
         'version': '2.1.1',
         'endpoints': {
             '/login': 'Test login functionality (GET)',
-            '/api/health': 'Health check endpoint (GET)',
+            '/api/health': 'Health check from cached state (GET; ?deep=1 runs a full authentication check)',
             '/api/generate/image': 'Generate AI Image with default model (GET: ?prompt=...&model=image_4.0)',
             '/api/generate/image-4.0': 'Generate with Image 4.0 model (GET: ?prompt=...)',
             '/api/generate/nano-banana': 'Generate with Nano Banana model (GET: ?prompt=...)',
+            '/api/jobs': 'Submit an asynchronous generation job (POST: {"prompt": ..., "model": ...})',
+            '/api/jobs/<job_id>': 'Poll job status and fetch its result (GET)',
+            '/api/generate/batch': 'Submit many prompts to run in one browser session (POST: {"items": [{"prompt": ...}]})',
             '/api/debug/screenshot': 'Get debug screenshot when generation fails (GET)',
             '/api/debug/html': 'Get debug HTML when generation fails (GET)',
-            '/api/debug/login-screenshots': 'List all login debug screenshots (GET)'
+            '/api/debug/login-screenshots': 'List all login debug screenshots (GET)',
+            '/api/debug/requests': 'Recent logins/generations with captured debug artifacts (GET: ?kind=login|generate|batch)',
+            '/api/debug/selector-stats': 'Per-step selector hit counts and latencies (GET)',
+            '/api/cache/stats': 'Result cache and request coalescing counters (GET)',
+            '/metrics': 'Per-stage latency histograms and counters in Prometheus text format (GET)',
+            '/api/images/<image_id>': 'Locally cached copy of a generated image (GET)',
+            '/api/images/<image_id>/variants/<name>': 'Resized / re-encoded variant of a cached image (GET)'
         },
         'supported_models': [
             'image_4.0',
@@ -46,7 +301,7 @@ def login_check():
         print("🔐 LOGIN ENDPOINT CALLED")
         print("=" * 60)
         
-        service = init_service()
+        service = service_pool.checkout()
         is_authenticated = service.check_authentication()
         
         if is_authenticated:
@@ -120,23 +375,49 @@ def login_check():
         
     finally:
         if service:
-            service.close()
+            service_pool.checkin(service)
         print("=" * 60)
         print("🔚 LOGIN ENDPOINT COMPLETED")
         print("=" * 60)
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
+    """Report cached login/browser/generation state; ?deep=1 runs a real authentication check"""
+    if request.args.get('deep', '').lower() in ('1', 'true', 'yes'):
+        return deep_health_check()
+    
+    snapshot = health_state.snapshot()
+    if snapshot['authenticated'] is False:
+        return jsonify({
+            'status': 'warning',
+            'authenticated': False,
+            'message': 'Last login attempt failed - Unable to log in to Dreamina',
+            'action_required': 'Verify your DREAMINA_EMAIL and DREAMINA_PASSWORD environment variables are correct',
+            'deep_check': '/api/health?deep=1',
+            'health': snapshot,
+            'pool': service_pool.stats()
+        }), 401
+    return jsonify({
+        'status': 'success',
+        'authenticated': snapshot['authenticated'],
+        'message': 'Service is healthy and authenticated' if snapshot['authenticated'] else 'Service is running; no login attempted yet',
+        'health': snapshot,
+        'pool': service_pool.stats()
+    })
+
+def deep_health_check():
+    """Check out a browser and verify authentication end to end (may launch Chrome and log in)"""
     service = None
     try:
-        service = init_service()
+        service = service_pool.checkout()
         is_authenticated = service.check_authentication()
         
         if is_authenticated:
             return jsonify({
                 'status': 'success',
                 'authenticated': True,
-                'message': 'Service is healthy and authenticated'
+                'message': 'Service is healthy and authenticated',
+                'pool': service_pool.stats()
             })
         else:
             return jsonify({
@@ -172,29 +453,35 @@ def health_check():
         }), 500
     finally:
         if service:
-            service.close()
+            service_pool.checkin(service)
+
+def send_debug_artifact(request_id, filename, missing_message):
+    """Serve one artifact from the debug store, from memory when it is still there"""
+    data, mimetype = get_debug_store().get_artifact(request_id, filename) if request_id else (None, None)
+    if data is None:
+        return jsonify({
+            'status': 'error',
+            'message': missing_message
+        }), 404
+    if isinstance(data, bytes):
+        return send_file(io.BytesIO(data), mimetype=mimetype, download_name=filename)
+    return send_file(data, mimetype=mimetype)
 
 @app.route('/api/debug/screenshot', methods=['GET'])
 def get_debug_screenshot():
-    """Get the debug screenshot if available"""
-    screenshot_path = '/tmp/dreamina_debug.png'
-    if os.path.exists(screenshot_path):
-        return send_file(screenshot_path, mimetype='image/png')
-    return jsonify({
-        'status': 'error',
-        'message': 'Debug screenshot not found. Generate an image first to create debug files.'
-    }), 404
+    """Get the screenshot of the most recent failed generation"""
+    request_id, filename = get_debug_store().latest(kind='generate', ext='jpg', failure_only=True)
+    if not request_id:
+        request_id, filename = get_debug_store().latest(kind='generate', ext='png', failure_only=True)
+    return send_debug_artifact(request_id, filename, 'Debug screenshot not found. Generate an image first to create debug files.')
 
 @app.route('/api/debug/auth-screenshot', methods=['GET'])
 def get_auth_screenshot():
-    """Get the authentication check screenshot if available"""
-    screenshot_path = '/tmp/dreamina_auth_check.png'
-    if os.path.exists(screenshot_path):
-        return send_file(screenshot_path, mimetype='image/png')
-    return jsonify({
-        'status': 'error',
-        'message': 'Authentication screenshot not found. Call /api/health first to generate it.'
-    }), 404
+    """Get the most recent login screenshot"""
+    request_id, filename = get_debug_store().latest(kind='login', ext='jpg')
+    if not request_id:
+        request_id, filename = get_debug_store().latest(kind='login', ext='png')
+    return send_debug_artifact(request_id, filename, 'Authentication screenshot not found. Call /api/health?deep=1 or /login first to generate it.')
 
 @app.route('/api/debug/credentials', methods=['GET'])
 def check_credentials():
@@ -215,11 +502,10 @@ def check_credentials():
 
 @app.route('/api/debug/login-screenshots', methods=['GET'])
 def list_login_screenshots():
-    """List all available login debug screenshots"""
+    """List the debug screenshots of recent logins"""
     screenshots = []
-    for file in os.listdir('/tmp'):
-        if file.startswith('login_') and file.endswith('.png'):
-            screenshots.append(f"/api/debug/login-screenshot/{file}")
+    for record in get_debug_store().list_requests(kind='login'):
+        screenshots.extend(a['url'] for a in record['artifacts'] if not a['file'].endswith('.html'))
     
     return jsonify({
         'status': 'success',
@@ -229,35 +515,73 @@ def list_login_screenshots():
 
 @app.route('/api/debug/login-screenshot/<filename>', methods=['GET'])
 def get_login_screenshot(filename):
-    """Get a specific login debug screenshot"""
-    if not filename.endswith('.png') or not filename.startswith('login_'):
+    """Get the newest login debug screenshot with this name (e.g. login_failed.jpg)"""
+    if not filename.startswith('login_') or not filename.endswith(('.jpg', '.png')):
         return jsonify({
             'status': 'error',
             'message': 'Invalid filename'
         }), 400
     
-    screenshot_path = f'/tmp/{filename}'
-    if os.path.exists(screenshot_path):
-        return send_file(screenshot_path, mimetype='image/png')
+    request_id, filename = get_debug_store().latest(kind='login', name=filename)
+    return send_debug_artifact(request_id, filename, f'Screenshot {filename} not found')
+
+@app.route('/api/debug/requests', methods=['GET'])
+def list_debug_requests():
+    """List recent logins/generations that captured debug artifacts, newest first"""
     return jsonify({
-        'status': 'error',
-        'message': f'Screenshot {filename} not found'
-    }), 404
+        'status': 'success',
+        'store': get_debug_store().stats(),
+        'requests': get_debug_store().list_requests(kind=request.args.get('kind'))
+    })
+
+@app.route('/api/debug/requests/<request_id>', methods=['GET'])
+def get_debug_request(request_id):
+    """Show the artifacts captured for one login/generation"""
+    record = get_debug_store().get_request(request_id)
+    if record is None:
+        return jsonify({
+            'status': 'error',
+            'message': f'Debug request {request_id} not found (it may have been evicted)'
+        }), 404
+    return jsonify({
+        'status': 'success',
+        'request': record
+    })
+
+@app.route('/api/debug/requests/<request_id>/<filename>', methods=['GET'])
+def get_debug_request_artifact(request_id, filename):
+    """Get one captured screenshot or HTML file"""
+    return send_debug_artifact(request_id, filename, f'Artifact {filename} of {request_id} not found (it may have been evicted)')
+
+@app.route('/api/debug/selector-stats', methods=['GET'])
+def get_selector_stats_report():
+    """Show which selector wins each login/generation step and how fast"""
+    return jsonify({
+        'status': 'success',
+        'steps': get_selector_stats().snapshot()
+    })
+
+@app.route('/api/debug/blocking', methods=['GET'])
+def get_blocking_report():
+    """Show the active resource-blocking rule set and page-load figures per rule set"""
+    return jsonify(dict(get_resource_blocker().stats(), status='success'))
+
+@app.route('/api/debug/poll-stats', methods=['GET'])
+def get_poll_stats():
+    """Show learned generation times per model and aspect ratio and the poll schedule they produce"""
+    return jsonify({
+        'status': 'success',
+        'generations': get_duration_model().snapshot()
+    })
 
 @app.route('/api/debug/html', methods=['GET'])
 def get_debug_html():
-    """Get the debug HTML if available"""
-    html_path = '/tmp/dreamina_debug.html'
-    if os.path.exists(html_path):
-        return send_file(html_path, mimetype='text/html')
-    return jsonify({
-        'status': 'error',
-        'message': 'Debug HTML not found. Generate an image first to create debug files.'
-    }), 404
+    """Get the page HTML of the most recent failed generation"""
+    request_id, filename = get_debug_store().latest(kind='generate', ext='html', failure_only=True)
+    return send_debug_artifact(request_id, filename, 'Debug HTML not found. Generate an image first to create debug files.')
 
 @app.route('/api/generate/image', methods=['GET'])
 def generate_image():
-    service = None
     try:
         prompt = request.args.get('prompt')
         if not prompt:
@@ -270,31 +594,29 @@ def generate_image():
         quality = request.args.get('quality', 'high')
         model = request.args.get('model', 'image_4.0')
         
-        service = init_service()
-        result = service.generate_image(
-            prompt=prompt,
-            aspect_ratio=aspect_ratio,
-            quality=quality,
-            model=model
-        )
+        result = run_generation(prompt, aspect_ratio, quality, model, use_cache=cache_requested(),
+                                min_images=parse_min_images(request.args.get('min_images')))
         
         if result.get('status') == 'success':
             return jsonify(result)
         else:
             return jsonify(result), 500
             
+    except AdmissionRejected as e:
+        return admission_rejected(e)
+    except PoolExhaustedError as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'All browsers are busy: {str(e)}'
+        }), 503
     except Exception as e:
         return jsonify({
             'status': 'error',
             'message': f'Image generation failed: {str(e)}'
         }), 500
-    finally:
-        if service:
-            service.close()
 
 @app.route('/api/generate/image-4.0', methods=['GET'])
 def generate_image_4_0():
-    service = None
     try:
         prompt = request.args.get('prompt')
         if not prompt:
@@ -306,31 +628,29 @@ def generate_image_4_0():
         aspect_ratio = request.args.get('aspect_ratio', '1:1')
         quality = request.args.get('quality', 'high')
         
-        service = init_service()
-        result = service.generate_image(
-            prompt=prompt,
-            aspect_ratio=aspect_ratio,
-            quality=quality,
-            model='image_4.0'
-        )
+        result = run_generation(prompt, aspect_ratio, quality, 'image_4.0', use_cache=cache_requested(),
+                                min_images=parse_min_images(request.args.get('min_images')))
         
         if result.get('status') == 'success':
             return jsonify(result)
         else:
             return jsonify(result), 500
             
+    except AdmissionRejected as e:
+        return admission_rejected(e)
+    except PoolExhaustedError as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'All browsers are busy: {str(e)}'
+        }), 503
     except Exception as e:
         return jsonify({
             'status': 'error',
             'message': f'Image generation failed: {str(e)}'
         }), 500
-    finally:
-        if service:
-            service.close()
 
 @app.route('/api/generate/nano-banana', methods=['GET'])
 def generate_nano_banana():
-    service = None
     try:
         prompt = request.args.get('prompt')
         if not prompt:
@@ -342,27 +662,280 @@ def generate_nano_banana():
         aspect_ratio = request.args.get('aspect_ratio', '1:1')
         quality = request.args.get('quality', 'high')
         
-        service = init_service()
-        result = service.generate_image(
-            prompt=prompt,
-            aspect_ratio=aspect_ratio,
-            quality=quality,
-            model='nano_banana'
-        )
+        result = run_generation(prompt, aspect_ratio, quality, 'nano_banana', use_cache=cache_requested(),
+                                min_images=parse_min_images(request.args.get('min_images')))
         
         if result.get('status') == 'success':
             return jsonify(result)
         else:
             return jsonify(result), 500
             
+    except AdmissionRejected as e:
+        return admission_rejected(e)
+    except PoolExhaustedError as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'All browsers are busy: {str(e)}'
+        }), 503
     except Exception as e:
         return jsonify({
             'status': 'error',
             'message': f'Image generation failed: {str(e)}'
         }), 500
-    finally:
-        if service:
-            service.close()
+
+@app.route('/api/generate/stream', methods=['GET'])
+def generate_stream():
+    """Stream a generation as Server-Sent Events, sending each image as soon as it appears"""
+    prompt = request.args.get('prompt')
+    if not prompt:
+        return jsonify({
+            'status': 'error',
+            'message': 'Missing required parameter: prompt'
+        }), 400
+    
+    aspect_ratio = request.args.get('aspect_ratio', '1:1')
+    quality = request.args.get('quality', 'high')
+    model = request.args.get('model', 'image_4.0')
+    min_images = parse_min_images(request.args.get('min_images'))
+    
+    # Settled before the stream starts, so a full queue is still a plain 429
+    use_cache = cache_requested()
+    cached = cached_result(prompt, aspect_ratio, quality, model, use_cache)
+    if cached is None:
+        try:
+            slot = reserve_browser(prompt, aspect_ratio, quality, model, min_images)
+        except AdmissionRejected as e:
+            return admission_rejected(e)
+    
+    events = queue.Queue()
+    stream = GenerationStream(events.put)
+    if cached is not None:
+        stream.finish(cached)
+    else:
+        threading.Thread(
+            target=stream_generation,
+            args=(stream, slot, prompt, aspect_ratio, quality, model, use_cache, min_images),
+            name='sse-generation',
+            daemon=True
+        ).start()
+    keepalive = float(os.environ.get('SSE_KEEPALIVE_INTERVAL', 15))
+    
+    def frames():
+        while True:
+            try:
+                item = events.get(timeout=keepalive)
+            except queue.Empty:
+                yield KEEPALIVE
+                continue
+            chunk, finished = stream.render(item)
+            yield b''.join(chunk)
+            if finished:
+                return
+    
+    # X-Accel-Buffering stops nginx-style proxies from holding events back
+    return Response(frames(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Report result cache hit/miss counters and request coalescing"""
+    return jsonify({
+        'status': 'success',
+        'cache': result_cache.stats(),
+        'coalescing': generation_flights.stats(),
+        'images': image_store.stats(),
+        'variants': variant_pipeline.stats()
+    })
+
+@app.route('/api/admission', methods=['GET'])
+def get_admission_stats():
+    """Report generate-route queue depth, estimated wait and rejections"""
+    return jsonify({
+        'status': 'success',
+        'admission': admission.stats()
+    })
+
+@app.route('/api/images/<image_id>', methods=['GET'])
+def get_image(image_id):
+    """Serve a generated image from the local cache, downloading it once if needed"""
+    if len(image_id) != 32 or any(c not in '0123456789abcdef' for c in image_id):
+        return jsonify({
+            'status': 'error',
+            'message': 'Invalid image id'
+        }), 400
+    
+    try:
+        path, meta = image_store.fetch(image_id)
+    except ImageNotFoundError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 404
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Could not fetch image: {str(e)}'
+        }), 502
+    
+    return send_file(path, mimetype=meta['content_type'], conditional=True, etag=meta['etag'], max_age=86400)
+
+@app.route('/api/images/<image_id>/variants/<name>', methods=['GET'])
+def get_image_variant(image_id, name):
+    """Serve a thumbnail / modern-format variant, rendering it first if it isn't ready yet"""
+    if len(image_id) != 32 or any(c not in '0123456789abcdef' for c in image_id):
+        return jsonify({
+            'status': 'error',
+            'message': 'Invalid image id'
+        }), 400
+    
+    try:
+        path, entry = variant_pipeline.get(image_id, name)
+    except ImageNotFoundError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 404
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Could not render variant: {str(e)}'
+        }), 502
+    
+    if path is None:
+        return jsonify({
+            'status': 'error',
+            'message': f'Unknown variant {name} (available: {", ".join(variant_pipeline.names)})'
+        }), 404
+    
+    # Variant files are named after their content hash, so they never change
+    response = send_file(path, mimetype=entry['content_type'], conditional=True, etag=entry['file'].split('.')[0], max_age=31536000)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus scrape endpoint"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """Queue a generation and return its job id without waiting for the browser"""
+    data = request.get_json(silent=True) or request.form or request.args
+    prompt = data.get('prompt')
+    if not prompt:
+        return jsonify({
+            'status': 'error',
+            'message': 'Missing required parameter: prompt'
+        }), 400
+    
+    params = {
+        'prompt': prompt,
+        'aspect_ratio': data.get('aspect_ratio', '1:1'),
+        'quality': data.get('quality', 'high'),
+        'model': data.get('model', 'image_4.0'),
+        'min_images': parse_min_images(data.get('min_images'))
+    }
+    # Queued jobs count toward admission like waiting requests; cache hits finish right away
+    cached = cached_result(params['prompt'], params['aspect_ratio'], params['quality'], params['model'])
+    if cached is not None:
+        job = job_manager.completed(params, cached)
+    else:
+        try:
+            slot = reserve_browser(params['prompt'], params['aspect_ratio'], params['quality'],
+                                   params['model'], params['min_images'])
+        except AdmissionRejected as e:
+            return admission_rejected(e)
+        job = job_manager.submit(params, runner=queued_generation(slot))
+    response = jsonify({
+        'status': 'success',
+        'job_id': job.id,
+        'job': job.to_dict(),
+        'status_url': f'/api/jobs/{job.id}'
+    })
+    response.headers['Location'] = f'/api/jobs/{job.id}'
+    return response, 202
+
+@app.route('/api/generate/batch', methods=['POST'])
+def submit_batch():
+    """Queue a batch of prompts that share one logged-in browser session"""
+    data = request.get_json(silent=True) or {}
+    raw_items = data.get('items') or [{'prompt': p} for p in data.get('prompts', [])]
+    max_items = int(os.environ.get('BATCH_MAX_ITEMS', 200))
+    
+    if not raw_items:
+        return jsonify({
+            'status': 'error',
+            'message': 'Missing required parameter: items (list of {"prompt": ...}) or prompts (list of strings)'
+        }), 400
+    if len(raw_items) > max_items:
+        return jsonify({
+            'status': 'error',
+            'message': f'Too many items: {len(raw_items)} (maximum {max_items})'
+        }), 400
+    
+    items = []
+    for index, raw in enumerate(raw_items):
+        if not isinstance(raw, dict) or not raw.get('prompt'):
+            return jsonify({
+                'status': 'error',
+                'message': f'Item {index} is missing required field: prompt'
+            }), 400
+        items.append({
+            'prompt': raw['prompt'],
+            'aspect_ratio': raw.get('aspect_ratio', data.get('aspect_ratio', '1:1')),
+            'quality': raw.get('quality', data.get('quality', 'high')),
+            'model': raw.get('model', data.get('model', 'image_4.0'))
+        })
+    
+    try:
+        tabs = int(data['tabs'] if data.get('tabs') is not None else os.environ.get('DREAMINA_BATCH_TABS', 1))
+        max_in_flight = None if data.get('max_in_flight') is None else int(data['max_in_flight'])
+    except (TypeError, ValueError):
+        return jsonify({
+            'status': 'error',
+            'message': 'tabs and max_in_flight must be whole numbers'
+        }), 400
+    if tabs < 1 or (max_in_flight is not None and max_in_flight < 1):
+        return jsonify({
+            'status': 'error',
+            'message': 'tabs and max_in_flight must be at least 1'
+        }), 400
+    # Every tab is a renderer in the same Chrome, so keep the count modest
+    tabs = min(tabs, int(os.environ.get('DREAMINA_BATCH_MAX_TABS', 4)))
+    
+    # A batch holds one browser for its whole run, so it takes one admission slot
+    slot = ExitStack()
+    try:
+        slot.enter_context(admission.admit())
+    except AdmissionRejected as e:
+        return admission_rejected(e)
+    job = job_manager.submit({
+        'items': items,
+        'max_in_flight': max_in_flight,
+        'tabs': tabs
+    }, runner=release_when_done(run_batch, slot))
+    response = jsonify({
+        'status': 'success',
+        'job_id': job.id,
+        'job': job.to_dict(),
+        'status_url': f'/api/jobs/{job.id}'
+    })
+    response.headers['Location'] = f'/api/jobs/{job.id}'
+    return response, 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Return the state of a job, including the generation result once finished"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({
+            'status': 'error',
+            'message': f'Job {job_id} not found (it may have expired)'
+        }), 404
+    return jsonify({
+        'status': 'success',
+        'job': job.to_dict()
+    })
 
 def startup_login():
     """Perform login on server startup"""
@@ -370,10 +943,12 @@ def startup_login():
     print("🚀 DREAMINA API SERVER STARTUP")
     print("="*60)
     
+    browser_binaries.report()
+    
     service = None
     try:
-        print("🔐 Initiating login process...")
-        service = init_service()
+        print("🔐 Initiating login process (warming browser pool)...")
+        service = service_pool.checkout()
         is_authenticated = service.check_authentication()
         
         if is_authenticated:
@@ -410,7 +985,7 @@ def startup_login():
         
     finally:
         if service:
-            service.close()
+            service_pool.checkin(service)
     
     print("\n🌐 Starting Flask server...")
     print("="*60)
@@ -0,0 +1,252 @@
+"""ASGI entry point: the same API, with generations awaited instead of holding a server thread.
+
+    uvicorn asgi_app:application --host 0.0.0.0 --port 8080
+
+The three GET generate routes and the /api/generate/stream event stream are
+served natively. A waiting client is just a suspended coroutine. Cache hits
+are answered on the event loop, and only requests that will lease a browser
+run on a dedicated executor sized to the driver pool. Every other route falls
+through to the Flask app via asgiref's WsgiToAsgi, run on a thread pool, so
+response shapes are identical in both serving modes.
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+
+import app as flask_module
+from admission import AdmissionRejected
+from driver_pool import PoolExhaustedError
+from sse import KEEPALIVE, GenerationStream
+
+flask_app = flask_module.app
+
+# Only browser work runs here; one thread per pooled browser is all that can make progress
+browser_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('ASGI_BROWSER_WORKERS', flask_module.service_pool.size)),
+    thread_name_prefix='browser'
+)
+
+# Requests joining an identical in-flight generation just wait for it, off the browser threads
+join_executor = ThreadPoolExecutor(thread_name_prefix='join')
+
+# Flask routes that fall through (/login, deep health checks, image fetches) may block for a while
+fallback_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('ASGI_FALLBACK_WORKERS', 8)),
+    thread_name_prefix='wsgi'
+)
+
+
+class PooledWsgiInstance(WsgiToAsgiInstance):
+    # asgiref runs this on its single thread-sensitive thread, so one slow route would stall the rest
+    run_wsgi_app = sync_to_async(WsgiToAsgiInstance.run_wsgi_app.__wrapped__,
+                                 thread_sensitive=False, executor=fallback_executor)
+
+
+class PooledWsgiToAsgi(WsgiToAsgi):
+    """WsgiToAsgi that runs each request on fallback_executor, so Flask routes run concurrently"""
+
+    async def __call__(self, scope, receive, send):
+        await PooledWsgiInstance(self.wsgi_application, self.duplicate_header_limit)(scope, receive, send)
+
+
+wsgi_fallback = PooledWsgiToAsgi(flask_app)
+
+# path -> fixed model, or None to take ?model= (default image_4.0)
+GENERATE_ROUTES = {
+    '/api/generate/image': None,
+    '/api/generate/image-4.0': 'image_4.0',
+    '/api/generate/nano-banana': 'nano_banana'
+}
+
+STREAM_ROUTE = '/api/generate/stream'
+
+
+async def send_json(send, body, status=200, headers=None):
+    payload = flask_app.json.dumps(body).encode('utf-8') + b'\n'
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(payload)).encode()),
+            # Matches flask-cors' default for the Flask routes
+            (b'access-control-allow-origin', b'*')
+        ] + [(name.lower().encode(), str(value).encode()) for name, value in (headers or {}).items()]
+    })
+    await send({'type': 'http.response.body', 'body': payload})
+
+
+async def wait_for_disconnect(receive):
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+
+
+def query_params(scope):
+    return {k: v[0] for k, v in parse_qs(scope.get('query_string', b'').decode('latin-1')).items()}
+
+
+async def generate(scope, receive, send, model):
+    query = query_params(scope)
+    prompt = query.get('prompt')
+    if not prompt:
+        return await send_json(send, {
+            'status': 'error',
+            'message': 'Missing required parameter: prompt'
+        }, 400)
+
+    aspect_ratio = query.get('aspect_ratio', '1:1')
+    quality = query.get('quality', 'high')
+    model = model or query.get('model', 'image_4.0')
+    min_images = flask_module.parse_min_images(query.get('min_images'))
+    use_cache = query.get('cache', 'true').lower() not in ('false', '0', 'no', 'off')
+    # Cache hits are answered right here, without admission or the executor
+    cached = flask_module.cached_result(prompt, aspect_ratio, quality, model, use_cache)
+    if cached is not None:
+        return await send_json(send, cached)
+    # Admitted before queueing on the executor, so the queue bound covers waiting coroutines too
+    try:
+        reserved = flask_module.reserve_browser(prompt, aspect_ratio, quality, model, min_images)
+    except AdmissionRejected as e:
+        return await send_json(send, flask_module.admission_rejected_body(e), 429, {'Retry-After': e.retry_after})
+    slot = reserved or ExitStack()
+    job = (browser_executor if reserved else join_executor).submit(
+        flask_module.run_generation, prompt, aspect_ratio, quality, model,
+        use_cache and reserved is None, None, min_images, reserved is not None
+    )
+    work = asyncio.wrap_future(job)
+    disconnect = asyncio.ensure_future(wait_for_disconnect(receive))
+    try:
+        await asyncio.wait({work, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        disconnect.cancel()
+    if not work.done():
+        # Client went away: drop the generation if it hasn't reached a browser yet.
+        # One that is already running finishes, still fills the result cache,
+        # and keeps its admission slot until then.
+        if job.cancel():
+            slot.close()
+        else:
+            job.add_done_callback(lambda _: slot.close())
+        print(f"🔌 Client disconnected while waiting for prompt: {prompt[:50]}")
+        return
+    slot.close()
+
+    try:
+        result = work.result()
+    except AdmissionRejected as e:
+        return await send_json(send, flask_module.admission_rejected_body(e), 429, {'Retry-After': e.retry_after})
+    except PoolExhaustedError as e:
+        return await send_json(send, {
+            'status': 'error',
+            'message': f'All browsers are busy: {str(e)}'
+        }, 503)
+    except Exception as e:
+        return await send_json(send, {
+            'status': 'error',
+            'message': f'Image generation failed: {str(e)}'
+        }, 500)
+    await send_json(send, result, 200 if result.get('status') == 'success' else 500)
+
+
+async def stream(scope, receive, send):
+    query = query_params(scope)
+    prompt = query.get('prompt')
+    if not prompt:
+        return await send_json(send, {
+            'status': 'error',
+            'message': 'Missing required parameter: prompt'
+        }, 400)
+
+    aspect_ratio = query.get('aspect_ratio', '1:1')
+    quality = query.get('quality', 'high')
+    model = query.get('model', 'image_4.0')
+    min_images = flask_module.parse_min_images(query.get('min_images'))
+    use_cache = query.get('cache', 'true').lower() not in ('false', '0', 'no', 'off')
+    cached = flask_module.cached_result(prompt, aspect_ratio, quality, model, use_cache)
+    reserved = None
+    if cached is None:
+        try:
+            reserved = flask_module.reserve_browser(prompt, aspect_ratio, quality, model, min_images)
+        except AdmissionRejected as e:
+            return await send_json(send, flask_module.admission_rejected_body(e), 429, {'Retry-After': e.retry_after})
+
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+    generation_stream = GenerationStream(lambda item: loop.call_soon_threadsafe(events.put_nowait, item))
+    job = None
+    if cached is not None:
+        generation_stream.finish(cached)
+    else:
+        # stream_generation releases the slot itself once it has run
+        job = (browser_executor if reserved else join_executor).submit(
+            flask_module.stream_generation, generation_stream, reserved,
+            prompt, aspect_ratio, quality, model, use_cache, min_images
+        )
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'text/event-stream; charset=utf-8'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+            (b'access-control-allow-origin', b'*')
+        ]
+    })
+    keepalive = float(os.environ.get('SSE_KEEPALIVE_INTERVAL', 15))
+    disconnect = asyncio.ensure_future(wait_for_disconnect(receive))
+    try:
+        while True:
+            getter = asyncio.ensure_future(events.get())
+            done, _ = await asyncio.wait({getter, disconnect}, timeout=keepalive,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if getter not in done:
+                getter.cancel()
+                if disconnect in done:
+                    if job and job.cancel() and reserved:
+                        reserved.close()
+                    print(f"🔌 Stream client disconnected for prompt: {prompt[:50]}")
+                    return
+                await send({'type': 'http.response.body', 'body': KEEPALIVE, 'more_body': True})
+                continue
+            frames, finished = generation_stream.render(getter.result())
+            await send({'type': 'http.response.body', 'body': b''.join(frames), 'more_body': not finished})
+            if finished:
+                return
+    finally:
+        disconnect.cancel()
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            flask_module.health_prober.start()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            for executor in (browser_executor, join_executor, fallback_executor):
+                executor.shutdown(wait=False, cancel_futures=True)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] == 'http' and scope['method'] == 'GET' and scope['path'] in GENERATE_ROUTES:
+        return await generate(scope, receive, send, GENERATE_ROUTES[scope['path']])
+    if scope['type'] == 'http' and scope['method'] == 'GET' and scope['path'] == STREAM_ROUTE:
+        return await stream(scope, receive, send)
+    return await wsgi_fallback(scope, receive, send)
+
+
+if __name__ == '__main__':
+    import uvicorn
+    flask_module.startup_login()
+    uvicorn.run(application, host='0.0.0.0', port=int(os.environ.get('PORT', 8080)))
@@ -0,0 +1,170 @@
+"""Local stand-in for the parts of Dreamina that DreaminaService drives.
+
+Serves a login page ("Continue with email" -> email/password form -> "Log in"),
+and a workspace with an "AI Image" tab, a prompt textarea and a "Generate"
+button that adds four result <img> elements after a configurable delay. Result
+image URLs contain 'ibyteimg.com' so the service's URL markers match them.
+Pages also pull a web font and a promo video, the kind of assets the
+resource-blocking rule sets drop, so their savings show up in the benchmarks.
+
+Run standalone with: python benchmarks/mock_dreamina.py --port 8765
+"""
+import argparse
+import base64
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+# 1x1 transparent PNG
+PIXEL_PNG = base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=='
+)
+
+LOGIN_PAGE = """<!DOCTYPE html>
+<html><head><title>Dreamina mock - login</title>
+<style>@font-face { font-family: Brand; src: url('/assets/brand.woff2') format('woff2'); } body { font-family: Brand, sans-serif; }</style>
+<link rel="preload" href="/assets/brand.woff2" as="font" type="font/woff2" crossorigin>
+</head>
+<body>
+<h1>Welcome</h1>
+<div id="choices"><button id="email-choice">Continue with email</button></div>
+<form id="form" style="display:none" onsubmit="return false;">
+  <input type="email" placeholder="Enter email">
+  <input type="password" placeholder="Enter password">
+  <button type="submit" id="submit">Log in</button>
+</form>
+<script>
+var config = %(config)s;
+document.getElementById('email-choice').addEventListener('click', function () {
+  setTimeout(function () {
+    document.getElementById('choices').style.display = 'none';
+    document.getElementById('form').style.display = 'block';
+  }, config.form_delay_ms);
+});
+document.getElementById('submit').addEventListener('click', function () {
+  setTimeout(function () {
+    document.cookie = 'mock_session=1; path=/';
+    location.href = '/ai-tool/home/';
+  }, config.login_delay_ms);
+});
+</script>
+</body></html>
+"""
+
+WORKSPACE_PAGE = """<!DOCTYPE html>
+<html><head><title>Dreamina mock - workspace</title>
+<style>@font-face { font-family: Brand; src: url('/assets/brand.woff2') format('woff2'); } body { font-family: Brand, sans-serif; }</style>
+<link rel="preload" href="/assets/brand.woff2" as="font" type="font/woff2" crossorigin>
+</head>
+<body>
+<nav><button id="ai-image">AI Image</button></nav>
+<video src="/assets/promo.mp4" autoplay muted loop></video>
+<main>
+  <textarea id="prompt" placeholder="Describe the image"></textarea>
+  <button id="generate" class="generate-button">Generate</button>
+  <section id="results"></section>
+</main>
+<script>
+var config = %(config)s;
+var generation = 0;
+document.getElementById('generate').addEventListener('click', function () {
+  var id = ++generation;
+  var results = document.getElementById('results');
+  for (var i = 0; i < 4; i++) {
+    (function (n) {
+      setTimeout(function () {
+        var img = document.createElement('img');
+        img.src = '/img/ibyteimg.com/' + Date.now() + '-' + id + '-' + n + '.png';
+        results.appendChild(img);
+      }, config.result_delay_ms + n * config.result_stagger_ms);
+    })(i);
+  }
+});
+</script>
+</body></html>
+"""
+
+
+class MockDreamina:
+    """Threaded HTTP server for the mock site; latencies are in seconds"""
+
+    def __init__(self, port=0, page_delay=0.05, form_delay=0.2, login_delay=0.5,
+                 result_delay=3.0, result_stagger=0.2, asset_delay=0.1, asset_bytes=256 * 1024):
+        self.page_delay = page_delay
+        self.asset_delay = asset_delay
+        self.asset_bytes = asset_bytes
+        self.config = {
+            'form_delay_ms': int(form_delay * 1000),
+            'login_delay_ms': int(login_delay * 1000),
+            'result_delay_ms': int(result_delay * 1000),
+            'result_stagger_ms': int(result_stagger * 1000)
+        }
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, body, content_type='text/html; charset=utf-8', headers=None):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                path = urlparse(self.path).path
+                if path.startswith('/img/'):
+                    return self._send(200, PIXEL_PNG, 'image/png')
+                if path.startswith('/assets/'):
+                    time.sleep(mock.asset_delay)
+                    content_type = 'font/woff2' if path.endswith('.woff2') else 'video/mp4'
+                    return self._send(200, b'\0' * mock.asset_bytes, content_type)
+
+                time.sleep(mock.page_delay)
+                config = json.dumps(mock.config)
+                if path.startswith('/ai-tool/login'):
+                    return self._send(200, (LOGIN_PAGE % {'config': config}).encode('utf-8'))
+                if path.startswith('/ai-tool/home'):
+                    if 'mock_session=1' not in self.headers.get('Cookie', ''):
+                        return self._send(302, b'', headers={'Location': '/ai-tool/login'})
+                    return self._send(200, (WORKSPACE_PAGE % {'config': config}).encode('utf-8'))
+                return self._send(404, b'not found', 'text/plain')
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name='mock-dreamina', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve the mock Dreamina site')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--result-delay', type=float, default=3.0)
+    args = parser.parse_args()
+    mock = MockDreamina(port=args.port, result_delay=args.result_delay).start()
+    print(f"🧪 Mock Dreamina running at {mock.base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        mock.stop()
@@ -0,0 +1,184 @@
+"""Offline login/generation benchmarks against the local mock Dreamina site.
+
+Drives the real DreaminaService (headless Chrome + the usual selectors and
+waits) against benchmarks/mock_dreamina.py, so timings only change when the
+service's code does. No network access is needed.
+
+    python benchmarks/run_benchmarks.py --iterations 3 --generations 5
+    python benchmarks/run_benchmarks.py --json results.json
+    python benchmarks/run_benchmarks.py --block-rules off,balanced,aggressive
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_dreamina import MockDreamina
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(samples):
+    return {
+        'runs': len(samples),
+        'p50': round(percentile(samples, 50), 3) if samples else None,
+        'p95': round(percentile(samples, 95), 3) if samples else None,
+        'mean': round(sum(samples) / len(samples), 3) if samples else None,
+        'max': round(max(samples), 3) if samples else None
+    }
+
+
+def stage_means():
+    """Mean seconds per stage recorded by the service's own metrics"""
+    import metrics
+    means = {}
+    for name, key, extra, value in metrics.STAGE_SECONDS.samples():
+        if name.endswith('_sum'):
+            means.setdefault(key[0], {})['sum'] = value
+        elif name.endswith('_count'):
+            means.setdefault(key[0], {})['count'] = value
+    return {stage: round(v['sum'] / v['count'], 3) for stage, v in means.items() if v.get('count')}
+
+
+def run(args):
+    mock = MockDreamina(
+        page_delay=args.page_delay,
+        form_delay=args.form_delay,
+        login_delay=args.login_delay,
+        result_delay=args.result_delay,
+        result_stagger=args.result_stagger
+    ).start()
+    scratch = tempfile.mkdtemp(prefix='dreamina-bench-')
+
+    # Point the service at the mock site and keep its state out of the real files
+    os.environ.update({
+        'DREAMINA_BASE_URL': mock.base_url,
+        'DREAMINA_EMAIL': 'bench@example.com',
+        'DREAMINA_PASSWORD': 'benchmark-password',
+        'DREAMINA_SESSION_FILE': os.path.join(scratch, 'session.json'),
+        'DREAMINA_SELECTOR_STATS_FILE': os.path.join(scratch, 'selector_stats.json'),
+        'DREAMINA_POLL_STATS_FILE': os.path.join(scratch, 'poll_stats.json'),
+        'DREAMINA_DEBUG_DIR': os.path.join(scratch, 'debug'),
+        'DREAMINA_DEBUG_LEVEL': args.debug_level,
+        'DREAMINA_CAPTURE_MODE': 'dom'
+    })
+    from dreamina_service import DreaminaService
+    from resource_blocking import ResourceBlocker, page_loads
+
+    rule_sets = [name.strip() for name in args.block_rules.split(',') if name.strip()]
+    latency = {}
+    failures = 0
+    print(f"🧪 Mock Dreamina at {mock.base_url}; {args.iterations} browsers x {args.generations} generations")
+    try:
+        for rule_set in rule_sets:
+            print(f"🚧 Rule set '{rule_set}'")
+            samples = {'driver_start': [], 'login': [], 'generate': []}
+            failures += run_rule_set(DreaminaService, ResourceBlocker(rule_set=rule_set, deny=[], allow=[]),
+                                     args, samples)
+            latency[rule_set] = {name: summarize(values) for name, values in samples.items()}
+    finally:
+        mock.stop()
+
+    report = {
+        'config': vars(args),
+        'latency': latency,
+        'stage_means': stage_means(),
+        'page_loads': page_loads.report()['rule_sets'],
+        'failures': failures
+    }
+    return report
+
+
+def run_rule_set(service_class, blocker, args, samples):
+    """Start, log in and generate with fresh browsers; returns the number of failed generations"""
+    failures = 0
+    for iteration in range(args.iterations):
+        service = service_class(resource_blocker=blocker)
+        try:
+            started = time.monotonic()
+            service.init_driver()
+            samples['driver_start'].append(time.monotonic() - started)
+
+            started = time.monotonic()
+            if not service.login_with_email(service.email, service.password):
+                raise RuntimeError('login failed against the mock site')
+            samples['login'].append(time.monotonic() - started)
+            service.is_authenticated = True
+
+            for n in range(args.generations):
+                started = time.monotonic()
+                result = service.generate_image(f'benchmark prompt {blocker.rule_set}-{iteration}-{n}')
+                if result['status'] == 'success':
+                    samples['generate'].append(time.monotonic() - started)
+                else:
+                    failures += 1
+                    print(f"✗ Generation failed: {result.get('message')}")
+        finally:
+            service.close()
+    return failures
+
+
+def print_report(report):
+    print("\n" + "=" * 60)
+    for rule_set, latency in report['latency'].items():
+        print(f"rule set: {rule_set}")
+        print(f"{'operation':<16}{'runs':>6}{'p50':>10}{'p95':>10}{'mean':>10}{'max':>10}")
+        for name, stats in latency.items():
+            if stats['runs']:
+                print(f"{name:<16}{stats['runs']:>6}{stats['p50']:>10.3f}{stats['p95']:>10.3f}"
+                      f"{stats['mean']:>10.3f}{stats['max']:>10.3f}")
+            else:
+                print(f"{name:<16}{0:>6}{'-':>10}{'-':>10}{'-':>10}{'-':>10}")
+        print("-" * 60)
+    print("page loads (mean load ms / KB transferred / JS heap MB):")
+    for rule_set, pages in report['page_loads'].items():
+        for page, means in sorted(pages.items()):
+            load = means.get('load_ms')
+            kb = means.get('transfer_bytes', 0) / 1024
+            heap = (means.get('js_heap_bytes') or 0) / (1024 * 1024)
+            savings = means.get('savings_pct', {})
+            note = (f"  saves {savings.get('load_ms', 0):.1f}% load time, "
+                    f"{savings.get('transfer_bytes', 0):.1f}% bytes vs off") if savings else ''
+            print(f"  {rule_set:<12}{page:<12}{load if load is not None else '-':>10}{kb:>10.1f}{heap:>8.1f}{note}")
+    print("-" * 60)
+    print("mean seconds per stage:")
+    for stage, seconds in sorted(report['stage_means'].items()):
+        print(f"  {stage:<20}{seconds:>8.3f}")
+    print(f"failures: {report['failures']}")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark login and generation against a local mock Dreamina site')
+    parser.add_argument('--iterations', type=int, default=3, help='fresh browsers to start and log in')
+    parser.add_argument('--generations', type=int, default=5, help='generate_image calls per browser')
+    parser.add_argument('--page-delay', type=float, default=0.05, help='server latency per page load (s)')
+    parser.add_argument('--form-delay', type=float, default=0.2, help='delay before the email form appears (s)')
+    parser.add_argument('--login-delay', type=float, default=0.5, help='delay between "Log in" and the redirect (s)')
+    parser.add_argument('--result-delay', type=float, default=3.0, help='delay before the first result image (s)')
+    parser.add_argument('--result-stagger', type=float, default=0.2, help='gap between the four result images (s)')
+    parser.add_argument('--block-rules', default='off,balanced',
+                        help='comma-separated resource-blocking rule sets to compare (see resource_blocking.py)')
+    parser.add_argument('--debug-level', default='off', help='DREAMINA_DEBUG_LEVEL during the run')
+    parser.add_argument('--json', help='also write the report to this file')
+    args = parser.parse_args()
+
+    report = run(args)
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.json}")
+    sys.exit(1 if report['failures'] else 0)
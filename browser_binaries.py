@@ -0,0 +1,140 @@
+import atexit
+import glob
+import os
+import subprocess
+import threading
+
+from selenium.webdriver.chrome.service import Service
+from webdriver_manager.chrome import ChromeDriverManager
+
+CHROME_PATHS = [
+    '/usr/bin/google-chrome',
+    '/usr/bin/chromium',
+    '/usr/bin/chromium-browser',
+    '/opt/google/chrome/chrome',
+    '/opt/google/chrome/google-chrome'
+]
+
+CHROMEDRIVER_PATHS = [
+    '/usr/local/bin/chromedriver',
+    '/usr/bin/chromedriver'
+]
+
+_lock = threading.Lock()
+_binaries = None
+_shared_service = None
+
+
+def _find_chrome():
+    # 1. Nix store (Replit environment)
+    chromium_paths = sorted(glob.glob('/nix/store/*-chromium-*/bin/chromium'))
+    if chromium_paths:
+        return chromium_paths[-1], 'nix'
+    # 2. Standard Linux locations (Render/production)
+    for path in CHROME_PATHS:
+        if os.path.exists(path):
+            return path, 'standard location'
+    return None, 'selenium default'
+
+
+def _find_chromedriver():
+    # 1. Environment variable (Docker/Render)
+    env_chromedriver = os.environ.get('CHROMEDRIVER_PATH')
+    if env_chromedriver and os.path.exists(env_chromedriver):
+        return env_chromedriver, 'CHROMEDRIVER_PATH'
+    # 2. Nix store (Replit)
+    chromedriver_paths = sorted(glob.glob('/nix/store/*-chromedriver-*/bin/chromedriver'))
+    if chromedriver_paths:
+        return chromedriver_paths[-1], 'nix'
+    # 3. Standard locations
+    for path in CHROMEDRIVER_PATHS:
+        if os.path.exists(path):
+            return path, 'standard location'
+    # 4. Download a matching driver (needs network)
+    return ChromeDriverManager().install(), 'webdriver-manager'
+
+
+def resolve_binaries():
+    """Locate Chrome and ChromeDriver once per process; later calls return the cached result"""
+    global _binaries
+    with _lock:
+        if _binaries is None:
+            chrome, chrome_source = _find_chrome()
+            chromedriver, chromedriver_source = _find_chromedriver()
+            _binaries = {
+                'chrome': chrome,
+                'chrome_source': chrome_source,
+                'chromedriver': chromedriver,
+                'chromedriver_source': chromedriver_source
+            }
+        return _binaries
+
+
+def _version(path):
+    try:
+        output = subprocess.run([path, '--version'], capture_output=True, text=True, timeout=10).stdout
+        return output.strip() or 'unknown'
+    except Exception as e:
+        return f'unavailable ({str(e)[:60]})'
+
+
+def report():
+    """Print which binaries will be used (and their versions) at startup"""
+    try:
+        binaries = resolve_binaries()
+    except Exception as e:
+        print(f"✗ Could not resolve browser binaries: {str(e)}")
+        return None
+    print("🧭 Browser binaries:")
+    if binaries['chrome']:
+        print(f"  Chrome:       {binaries['chrome']} ({binaries['chrome_source']}) - {_version(binaries['chrome'])}")
+    else:
+        print("  Chrome:       not found in standard locations, Selenium will use its default")
+    print(f"  ChromeDriver: {binaries['chromedriver']} ({binaries['chromedriver_source']}) - {_version(binaries['chromedriver'])}")
+    print(f"  Shared chromedriver service: {'on' if shared_service_enabled() else 'off'}")
+    return binaries
+
+
+class SharedChromeService(Service):
+    """A chromedriver process that outlives individual browser sessions.
+
+    webdriver.Chrome calls start() when a driver is created and stop() on
+    quit(); here start() only launches chromedriver if it isn't already
+    running and stop() leaves it up, so every driver after the first skips
+    the process spawn. shutdown() really stops it.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        with self._start_lock:
+            process = getattr(self, 'process', None)
+            if process is not None and process.poll() is None and self.is_connectable():
+                return
+            print("🚦 Starting shared chromedriver service")
+            super().start()
+
+    def stop(self):
+        pass
+
+    def shutdown(self):
+        super().stop()
+
+
+def shared_service_enabled():
+    return os.environ.get('DREAMINA_SHARED_CHROMEDRIVER', 'true').lower() not in ('false', '0', 'no', 'off')
+
+
+def get_driver_service():
+    """The Service to pass to webdriver.Chrome: the shared one, or a per-driver one if disabled"""
+    global _shared_service
+    chromedriver = resolve_binaries()['chromedriver']
+    if not shared_service_enabled():
+        return Service(chromedriver)
+    with _lock:
+        if _shared_service is None:
+            _shared_service = SharedChromeService(chromedriver)
+            atexit.register(_shared_service.shutdown)
+        return _shared_service
@@ -0,0 +1,170 @@
+import fcntl
+import glob
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+
+# Chrome's own single-instance markers; stale ones from a crashed browser block the next launch
+SINGLETON_FILES = ('SingletonLock', 'SingletonSocket', 'SingletonCookie')
+
+# Not worth copying between launches
+COPY_IGNORE = shutil.ignore_patterns(*SINGLETON_FILES, 'Crashpad', 'Crash Reports', '*.tmp', '.lock')
+
+_lock = threading.Lock()
+
+
+def _clear_singletons(path):
+    for name in SINGLETON_FILES:
+        try:
+            os.unlink(os.path.join(path, name))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Could not remove stale {name} in {path}: {e}")
+
+
+class ProfileLease:
+    """A Chrome --user-data-dir this process owns until release()"""
+
+    def __init__(self, path, lock_file=None, template=None, manager=None):
+        self.path = path
+        self._lock_file = lock_file
+        self._template = template
+        self._manager = manager
+
+    @property
+    def mode(self):
+        return 'copy' if self._template else 'lock'
+
+    def release(self, save=False):
+        """Give the profile back; in copy mode, save=True makes this copy the new template"""
+        if self._lock_file is not None:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            self._lock_file.close()
+            self._lock_file = None
+        if self._template:
+            if save and self._template == self._manager.template_path:
+                self._manager.promote(self.path)
+            shutil.rmtree(self.path, ignore_errors=True)
+            self._template = None
+
+
+class ChromeProfiles:
+    """Persistent, pre-warmed Chrome profiles under one directory.
+
+    'lock' mode keeps up to `slots` long-lived profiles (slot-0, slot-1, ...),
+    each guarded by an fcntl lock so two browsers never open the same one,
+    even across gunicorn workers. 'copy' mode launches every browser from a
+    fresh copy of a shared template, and a logged-in browser's copy can be
+    promoted to become the next template. When every slot is locked, lock mode
+    falls back to a copy of slot-0.
+    """
+
+    def __init__(self, directory=None, mode=None, slots=None):
+        self.directory = directory if directory is not None else os.environ.get('DREAMINA_CHROME_PROFILE_DIR', '')
+        self.mode = (mode or os.environ.get('DREAMINA_CHROME_PROFILE_MODE', 'lock')).lower()
+        self.slots = slots or int(os.environ.get('DREAMINA_CHROME_PROFILE_SLOTS', 4))
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            self._remove_stale_copies()
+
+    @property
+    def enabled(self):
+        return bool(self.directory)
+
+    @property
+    def template_path(self):
+        return os.path.join(self.directory, 'template')
+
+    def acquire(self):
+        """Return a ProfileLease, or None when persistent profiles are disabled"""
+        if not self.enabled:
+            return None
+        if self.mode == 'lock':
+            for slot in range(self.slots):
+                lease = self._try_slot(slot)
+                if lease:
+                    return lease
+            print(f"All {self.slots} Chrome profile slots are in use, launching from a copy")
+            return self._copy(os.path.join(self.directory, 'slot-0'))
+        return self._copy(self.template_path)
+
+    def _try_slot(self, slot):
+        path = os.path.join(self.directory, f'slot-{slot}')
+        os.makedirs(path, exist_ok=True)
+        lock_file = open(os.path.join(self.directory, f'slot-{slot}.lock'), 'w')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return None
+        # We hold the lock, so any Chrome markers left here belong to a dead browser
+        _clear_singletons(path)
+        print(f"🗃 Using persistent Chrome profile {path}")
+        return ProfileLease(path, lock_file=lock_file)
+
+    def _copy(self, source):
+        path = tempfile.mkdtemp(prefix='chrome-profile-', dir=self.directory)
+        # Held for the copy's lifetime so _remove_stale_copies can tell live copies from crashed ones
+        lock_file = open(os.path.join(path, '.lock'), 'w')
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        with self._template_lock(shared=True):
+            if os.path.isdir(source):
+                shutil.copytree(source, path, ignore=COPY_IGNORE, dirs_exist_ok=True, symlinks=True)
+                print(f"🗃 Launching Chrome from a copy of {source}")
+        return ProfileLease(path, lock_file=lock_file, template=source, manager=self)
+
+    def _remove_stale_copies(self):
+        """Delete copies left behind by processes that died without releasing them"""
+        for path in glob.glob(os.path.join(self.directory, 'chrome-profile-*')):
+            try:
+                with open(os.path.join(path, '.lock'), 'w') as lock_file:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                continue
+            except OSError:
+                pass
+            shutil.rmtree(path, ignore_errors=True)
+
+    def promote(self, path):
+        """Atomically replace the template with a copy of path"""
+        staging = tempfile.mkdtemp(prefix='template-staging-', dir=self.directory)
+        try:
+            shutil.copytree(path, staging, ignore=COPY_IGNORE, dirs_exist_ok=True, symlinks=True)
+            with self._template_lock(shared=False):
+                old = None
+                if os.path.isdir(self.template_path):
+                    old = tempfile.mkdtemp(prefix='template-old-', dir=self.directory)
+                    os.rmdir(old)
+                    os.rename(self.template_path, old)
+                os.rename(staging, self.template_path)
+            if old:
+                shutil.rmtree(old, ignore_errors=True)
+            print("🗃 Updated the Chrome profile template")
+        except Exception as e:
+            shutil.rmtree(staging, ignore_errors=True)
+            print(f"Could not update the Chrome profile template: {e}")
+
+    @contextmanager
+    def _template_lock(self, shared):
+        """Readers copying the template share the lock; swapping it in needs it exclusively"""
+        with open(os.path.join(self.directory, 'template.lock'), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+_default_profiles = None
+
+
+def get_chrome_profiles():
+    """Process-wide ChromeProfiles configured from the environment"""
+    global _default_profiles
+    with _lock:
+        if _default_profiles is None:
+            _default_profiles = ChromeProfiles()
+        return _default_profiles
@@ -0,0 +1,258 @@
+import base64
+import os
+import queue
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+# 'off' captures nothing, 'failure' only when a step fails, 'steps' after every login/generation step
+LEVELS = ('off', 'failure', 'steps')
+
+MIMETYPES = {'jpg': 'image/jpeg', 'png': 'image/png', 'html': 'text/html'}
+
+
+class DebugStore:
+    """Bounded ring buffer of debug screenshots and HTML, grouped by request id.
+
+    The only work done on the caller's thread is asking Chrome for the
+    screenshot / page source; decoding and disk writes happen on a background
+    writer thread. The newest artifacts are also kept in memory (up to
+    memory_bytes) so the debug endpoints can serve them without touching
+    disk. Whole requests are dropped oldest first once max_requests or
+    disk_bytes is exceeded.
+    """
+
+    def __init__(self, directory=None, level=None, max_requests=None, memory_bytes=None, disk_bytes=None):
+        self.directory = directory or os.environ.get('DREAMINA_DEBUG_DIR', '/tmp/dreamina_debug')
+        self.level = (level or os.environ.get('DREAMINA_DEBUG_LEVEL', 'failure')).lower()
+        if self.level not in LEVELS:
+            print(f"Unknown DREAMINA_DEBUG_LEVEL {self.level!r}, using 'failure'")
+            self.level = 'failure'
+        self.max_requests = max_requests or int(os.environ.get('DREAMINA_DEBUG_MAX_REQUESTS', 50))
+        self.memory_bytes = memory_bytes or int(os.environ.get('DREAMINA_DEBUG_MEMORY_BYTES', 8 * 1024 * 1024))
+        self.disk_bytes = disk_bytes or int(os.environ.get('DREAMINA_DEBUG_DISK_BYTES', 64 * 1024 * 1024))
+
+        self._lock = threading.Lock()
+        self._requests = OrderedDict()
+        self._memory_used = 0
+        self._disk_used = 0
+        self._queue = queue.Queue()
+        self._writer = None
+        self.dropped = 0
+        # Records only live in memory, so files from a previous process are unreachable
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def wants(self, failure):
+        """Whether a capture at this severity should happen at all"""
+        if self.level == 'off':
+            return False
+        return failure or self.level == 'steps'
+
+    def begin(self, kind):
+        """Start a new request record and return its id"""
+        request_id = f"{kind}-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        with self._lock:
+            self._requests[request_id] = {
+                'id': request_id,
+                'kind': kind,
+                'started_at': time.time(),
+                'outcome': None,
+                'artifacts': []
+            }
+            self._trim()
+        return request_id
+
+    def finish(self, request_id, outcome):
+        """Mark a request 'success' or 'failure'; requests with nothing captured are forgotten"""
+        with self._lock:
+            record = self._requests.get(request_id)
+            if record is None:
+                return
+            if not record['artifacts'] and outcome == 'success':
+                del self._requests[request_id]
+            else:
+                record['outcome'] = outcome
+
+    def capture(self, request_id, name, driver, failure=False, html=False):
+        """Grab a screenshot (and optionally the page HTML) if the debug level asks for it.
+
+        Returns the artifact file names, or [] when nothing was captured.
+        """
+        if not request_id or driver is None or not self.wants(failure):
+            return []
+        files = []
+        try:
+            try:
+                # JPEG through CDP is much cheaper for Chrome to produce than the PNG WebDriver returns
+                encoded = driver.execute_cdp_cmd('Page.captureScreenshot', {'format': 'jpeg', 'quality': 70})['data']
+                ext = 'jpg'
+            except Exception:
+                encoded = driver.get_screenshot_as_base64()
+                ext = 'png'
+            files.append(self._add(request_id, name, ext, failure, lambda: base64.b64decode(encoded)))
+            if html:
+                source = driver.page_source
+                files.append(self._add(request_id, name, 'html', failure, lambda: source.encode('utf-8')))
+        except Exception as e:
+            print(f"Could not capture debug artifacts for {name}: {str(e)[:80]}")
+        return [f for f in files if f]
+
+    def _add(self, request_id, name, ext, failure, produce):
+        with self._lock:
+            record = self._requests.get(request_id)
+            if record is None:
+                return None
+            filename = f"{name}.{ext}"
+            taken = {a['file'] for a in record['artifacts']}
+            if filename in taken:
+                filename = f"{name}_{len(record['artifacts'])}.{ext}"
+            artifact = {
+                'file': filename,
+                'name': name,
+                'failure': failure,
+                'created_at': time.time(),
+                'size': None,
+                'data': None,
+                'on_disk': False
+            }
+            record['artifacts'].append(artifact)
+        self._ensure_writer()
+        self._queue.put((request_id, artifact, produce))
+        return filename
+
+    def _ensure_writer(self):
+        with self._lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._write_loop, name='debug-writer', daemon=True)
+                self._writer.start()
+
+    def _write_loop(self):
+        while True:
+            request_id, artifact, produce = self._queue.get()
+            try:
+                data = produce()
+                directory = os.path.join(self.directory, request_id)
+                os.makedirs(directory, exist_ok=True)
+                with open(os.path.join(directory, artifact['file']), 'wb') as f:
+                    f.write(data)
+                with self._lock:
+                    if request_id not in self._requests:
+                        shutil.rmtree(directory, ignore_errors=True)
+                        continue
+                    artifact['size'] = len(data)
+                    artifact['data'] = data
+                    artifact['on_disk'] = True
+                    self._memory_used += len(data)
+                    self._disk_used += len(data)
+                    self._trim()
+            except Exception as e:
+                print(f"Could not write debug artifact {artifact['file']}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _trim(self):
+        """Enforce the request, disk and memory limits (lock held)"""
+        while self._requests and (len(self._requests) > self.max_requests or self._disk_used > self.disk_bytes):
+            request_id, record = self._requests.popitem(last=False)
+            for artifact in record['artifacts']:
+                if artifact['data'] is not None:
+                    self._memory_used -= artifact['size']
+                if artifact['on_disk']:
+                    self._disk_used -= artifact['size']
+            shutil.rmtree(os.path.join(self.directory, request_id), ignore_errors=True)
+            self.dropped += 1
+        for record in self._requests.values():
+            if self._memory_used <= self.memory_bytes:
+                break
+            for artifact in record['artifacts']:
+                if artifact['data'] is not None:
+                    self._memory_used -= artifact['size']
+                    artifact['data'] = None
+
+    def flush(self):
+        """Wait until every queued artifact has been written"""
+        self._queue.join()
+
+    def _public(self, record):
+        summary = {k: v for k, v in record.items() if k != 'artifacts'}
+        summary['artifacts'] = [
+            {
+                'file': a['file'],
+                'name': a['name'],
+                'failure': a['failure'],
+                'size': a['size'],
+                'url': f"/api/debug/requests/{record['id']}/{a['file']}"
+            }
+            for a in record['artifacts']
+        ]
+        return summary
+
+    def list_requests(self, kind=None):
+        """Newest first"""
+        with self._lock:
+            records = [r for r in reversed(self._requests.values()) if kind is None or r['kind'] == kind]
+            return [self._public(r) for r in records]
+
+    def get_request(self, request_id):
+        with self._lock:
+            record = self._requests.get(request_id)
+            return self._public(record) if record else None
+
+    def get_artifact(self, request_id, filename):
+        """Return (bytes or file path, mimetype), or (None, None) if unknown or evicted"""
+        with self._lock:
+            record = self._requests.get(request_id)
+            artifact = next((a for a in record['artifacts'] if a['file'] == filename), None) if record else None
+            if artifact is None:
+                return None, None
+            mimetype = MIMETYPES.get(filename.rsplit('.', 1)[-1], 'application/octet-stream')
+            if artifact['data'] is not None:
+                return artifact['data'], mimetype
+            path = os.path.join(self.directory, request_id, filename)
+            return (path, mimetype) if artifact['on_disk'] else (None, None)
+
+    def latest(self, kind=None, ext=None, name=None, failure_only=False):
+        """(request_id, filename) of the newest matching artifact, or (None, None)"""
+        with self._lock:
+            for record in reversed(self._requests.values()):
+                if kind is not None and record['kind'] != kind:
+                    continue
+                for artifact in reversed(record['artifacts']):
+                    if ext is not None and not artifact['file'].endswith(f'.{ext}'):
+                        continue
+                    if name is not None and artifact['file'] != name:
+                        continue
+                    if failure_only and not artifact['failure']:
+                        continue
+                    if artifact['data'] is not None or artifact['on_disk']:
+                        return record['id'], artifact['file']
+            return None, None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'level': self.level,
+                'requests': len(self._requests),
+                'max_requests': self.max_requests,
+                'memory_bytes': self._memory_used,
+                'max_memory_bytes': self.memory_bytes,
+                'disk_bytes': self._disk_used,
+                'max_disk_bytes': self.disk_bytes,
+                'pending_writes': self._queue.unfinished_tasks,
+                'dropped_requests': self.dropped
+            }
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def get_debug_store():
+    """Process-wide DebugStore shared by every DreaminaService"""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = DebugStore()
+        return _default_store
@@ -0,0 +1,87 @@
+# Collects everything the flows need to know about the page in one execute_script
+# round trip, instead of one chromedriver call per element and attribute.
+PROBE_JS = """
+var markers = arguments[0], maxButtons = arguments[1], maxInputs = arguments[2];
+
+function visible(el) {
+    if (!el.getClientRects().length) return false;
+    var style = window.getComputedStyle(el);
+    return style.visibility !== 'hidden' && style.display !== 'none';
+}
+
+var images = [], seen = {};
+var imgs = document.getElementsByTagName('img');
+for (var i = 0; i < imgs.length; i++) {
+    var src = imgs[i].src;
+    if (!src || seen[src]) continue;
+    for (var m = 0; m < markers.length; m++) {
+        if (src.indexOf(markers[m]) !== -1) {
+            seen[src] = true;
+            images.push(src);
+            break;
+        }
+    }
+}
+
+var buttons = [];
+var btns = document.getElementsByTagName('button');
+for (var b = 0; b < btns.length && b < maxButtons; b++) {
+    buttons.push({
+        text: (btns[b].innerText || '').trim().slice(0, 80),
+        cls: (btns[b].getAttribute('class') || '').slice(0, 80),
+        type: btns[b].getAttribute('type'),
+        visible: visible(btns[b]),
+        enabled: !btns[b].disabled
+    });
+}
+
+var inputs = [];
+var fields = document.querySelectorAll('input, textarea');
+for (var f = 0; f < fields.length && f < maxInputs; f++) {
+    inputs.push({
+        tag: fields[f].tagName.toLowerCase(),
+        type: fields[f].getAttribute('type'),
+        name: fields[f].getAttribute('name'),
+        placeholder: fields[f].getAttribute('placeholder'),
+        visible: visible(fields[f])
+    });
+}
+
+return {
+    url: location.href,
+    ready_state: document.readyState,
+    img_total: imgs.length,
+    images: images,
+    button_total: btns.length,
+    buttons: buttons,
+    input_total: fields.length,
+    inputs: inputs,
+    has_prompt_input: !!document.querySelector('textarea')
+};
+"""
+
+
+def snapshot(driver, image_markers=(), max_buttons=0, max_inputs=0):
+    """Return a compact JSON snapshot of the current page in a single round trip.
+
+    images holds the de-duplicated src of every <img> containing one of
+    image_markers; buttons/inputs are only described up to the given limits.
+    """
+    return driver.execute_script(PROBE_JS, list(image_markers), max_buttons, max_inputs)
+
+
+def describe_buttons(snap):
+    lines = []
+    for i, btn in enumerate(snap['buttons']):
+        lines.append(f"[{i}] Text:'{btn['text'] or 'No text'}' | Class:'{btn['cls'] or 'No class'}' | "
+                     f"Type:'{btn['type'] or 'no type'}' | Visible:{btn['visible']} | Enabled:{btn['enabled']}")
+    return lines
+
+
+def describe_inputs(snap):
+    lines = []
+    for i, inp in enumerate(snap['inputs'], 1):
+        lines.append(f"{i}. Tag: {inp['tag']}, Type: {inp['type'] or 'no-type'}, "
+                     f"Placeholder: {inp['placeholder'] or 'no-placeholder'}, "
+                     f"Name: {inp['name'] or 'no-name'}, Visible: {inp['visible']}")
+    return lines
@@ -1,25 +1,90 @@
 import json
 import os
 import time
-import glob
 import requests
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.keys import Keys
-from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
-from webdriver_manager.chrome import ChromeDriverManager
+from selenium.common.exceptions import StaleElementReferenceException
+import dom_probe
+from adaptive_polling import PollSchedule, get_duration_model
+from browser_binaries import get_driver_service, resolve_binaries
+from chrome_profile import get_chrome_profiles
+import metrics
+from debug_store import get_debug_store
+from health import get_health_state
+from network_capture import NetworkCapture
+from resource_blocking import get_resource_blocker
+from selector_resolver import resolve_first
+from selector_stats import get_selector_stats
+from session_store import SessionStore
+from waits import (
+    WaitEngine,
+    all_of,
+    any_of,
+    document_ready,
+    dom_quiet,
+    element_enabled,
+    element_gone,
+    network_idle,
+    url_changes,
+    value_equals,
+)
+
+# Substrings identifying Dreamina result image URLs
+IMAGE_URL_MARKERS = ('ibyteimg.com', 'bytedance', 'capcut')
+
+# Dreamina renders this many results per prompt
+IMAGES_PER_GENERATION = 4
+
+# Text that only appears on Dreamina pages shown to logged-out visitors
+LOGIN_KEYWORDS = ['sign in', 'log in', 'continue with google', 'continue with email']
+
+# Replays saved localStorage on the Dreamina origin before any page script runs
+RESTORE_LOCAL_STORAGE_JS = """
+(function() {
+    if (location.origin !== %s) return;
+    var items = %s;
+    for (var key in items) {
+        try { localStorage.setItem(key, items[key]); } catch (e) {}
+    }
+})();
+"""
+
+DUMP_LOCAL_STORAGE_JS = """
+var items = {};
+for (var i = 0; i < localStorage.length; i++) {
+    var key = localStorage.key(i);
+    items[key] = localStorage.getItem(key);
+}
+return items;
+"""
 
 class DreaminaService:
-    def __init__(self):
-        self.base_url = "https://dreamina.capcut.com"
-        self.login_url = "https://dreamina.capcut.com/ai-tool/login"
-        self.home_url = "https://dreamina.capcut.com/ai-tool/home/"
+    def __init__(self, session_store=None, selector_stats=None, debug_store=None, chrome_profiles=None,
+                 resource_blocker=None, duration_model=None):
+        # Overridable so benchmarks can point the service at a local mock site
+        self.base_url = os.environ.get('DREAMINA_BASE_URL', 'https://dreamina.capcut.com').rstrip('/')
+        self.login_url = f"{self.base_url}/ai-tool/login"
+        self.home_url = f"{self.base_url}/ai-tool/home/"
         self.driver = None
+        self.waits = None
         self.is_authenticated = False
+        self.session_store = session_store or SessionStore()
+        self.selector_stats = selector_stats or get_selector_stats()
+        self.debug_store = debug_store or get_debug_store()
+        # Debug artifacts of the current login/generation are grouped under this id
+        self.debug_request = None
+        # Persistent --user-data-dir (see chrome_profile.py); None means a throwaway profile
+        self.chrome_profiles = chrome_profiles or get_chrome_profiles()
+        self.profile = None
+        # CDP URL blocking for trackers/fonts/media (see resource_blocking.py)
+        self.resource_blocker = resource_blocker or get_resource_blocker()
+        # Learned generation times that pace the result polling (see adaptive_polling.py)
+        self.duration_model = duration_model or get_duration_model()
+        # 'dom' scans <img> tags, 'cdp' reads API responses, 'auto' uses both
+        self.capture_mode = os.environ.get('DREAMINA_CAPTURE_MODE', 'auto').lower()
         
         # Verify we have credentials
         self.email = os.environ.get('DREAMINA_EMAIL')
@@ -36,15 +101,123 @@ class DreaminaService:
         if self.is_authenticated:
             return True
         
+        with metrics.stage('restore_session'):
+            restored = self.restore_session()
+        if restored:
+            self.is_authenticated = True
+            metrics.LOGINS.inc(method='session', outcome='success')
+            get_health_state().record_login('session', True)
+            print("✓ Authentication restored from saved session")
+            return True
+        
         print("Performing login...")
-        success = self.login_with_email(self.email, self.password)
+        try:
+            with metrics.stage('login'):
+                success = self.login_with_email(self.email, self.password)
+        except Exception:
+            metrics.LOGINS.inc(method='email', outcome='error')
+            get_health_state().record_login('email', False)
+            raise
+        metrics.LOGINS.inc(method='email', outcome='success' if success else 'failure')
+        get_health_state().record_login('email', success)
         if success:
             self.is_authenticated = True
             print("✓ Authentication successful")
+            self.save_session()
         else:
             print("✗ Authentication failed")
         return success
     
+    def _login_keywords_on_page(self):
+        """Return the logged-out markers present on the current page"""
+        page_source = self.driver.page_source.lower()
+        return [kw for kw in LOGIN_KEYWORDS if kw in page_source]
+    
+    def save_session(self):
+        """Persist cookies and localStorage so new browsers can skip the UI login"""
+        try:
+            cookies = self.driver.get_cookies()
+            local_storage = self.driver.execute_script(DUMP_LOCAL_STORAGE_JS)
+            self.session_store.save(cookies, local_storage, self.base_url)
+            print(f"✓ Saved session ({len(cookies)} cookies) to {self.session_store.path}")
+        except Exception as e:
+            print(f"Could not save session: {str(e)}")
+    
+    def restore_session(self):
+        """Load the saved session into a fresh browser and verify it is still logged in"""
+        state = self.session_store.load()
+        if not state:
+            if not self.chrome_profiles.enabled:
+                return False
+            self.init_driver()
+            return self._profile_logged_in()
+        
+        script_id = None
+        try:
+            driver = self.init_driver()
+            print(f"Restoring saved session ({len(state['cookies'])} cookies)...")
+            
+            # CDP lets us set cookies and localStorage before the first navigation,
+            # so the very first page load is already authenticated
+            cookies = []
+            for cookie in state['cookies']:
+                param = {
+                    'name': cookie['name'],
+                    'value': cookie['value'],
+                    'domain': cookie.get('domain'),
+                    'path': cookie.get('path', '/'),
+                    'secure': cookie.get('secure', False),
+                    'httpOnly': cookie.get('httpOnly', False)
+                }
+                if cookie.get('expiry'):
+                    param['expires'] = cookie['expiry']
+                if cookie.get('sameSite') in ('Strict', 'Lax', 'None'):
+                    param['sameSite'] = cookie['sameSite']
+                cookies.append(param)
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setCookies', {'cookies': cookies})
+            
+            if state.get('local_storage'):
+                source = RESTORE_LOCAL_STORAGE_JS % (
+                    json.dumps(state.get('origin', self.base_url)),
+                    json.dumps(state['local_storage'])
+                )
+                script_id = driver.execute_cdp_cmd(
+                    'Page.addScriptToEvaluateOnNewDocument', {'source': source}
+                ).get('identifier')
+            
+            driver.get(self.home_url)
+            
+            if '/login' in driver.current_url or self._login_keywords_on_page():
+                print("✗ Saved session is stale, falling back to UI login")
+                self.session_store.clear()
+                driver.delete_all_cookies()
+                return False
+            return True
+        except Exception as e:
+            print(f"Could not restore saved session: {str(e)}")
+            return False
+        finally:
+            if script_id and self.driver:
+                try:
+                    self.driver.execute_cdp_cmd(
+                        'Page.removeScriptToEvaluateOnNewDocument', {'identifier': script_id}
+                    )
+                except Exception:
+                    pass
+    
+    def _profile_logged_in(self):
+        """A persistent profile may still hold a logged-in Dreamina cookie jar"""
+        try:
+            self.driver.get(self.home_url)
+            if '/login' in self.driver.current_url or self._login_keywords_on_page():
+                return False
+            print("✓ Persistent Chrome profile is already logged in")
+            return True
+        except Exception as e:
+            print(f"Could not check persistent profile login: {str(e)[:80]}")
+            return False
+    
     def init_driver(self):
         if self.driver is not None:
             return self.driver
@@ -79,74 +252,34 @@ class DreaminaService:
         chrome_options.add_argument('--disable-domain-reliability')
         chrome_options.add_argument('--disable-client-side-phishing-detection')
         
-        # Note: We used to block image loading to save bandwidth, but this prevents
-        # Dreamina from populating generated image URLs in the src attributes.
-        # Memory tradeoff is acceptable for functional image generation.
+        # Reuse a warm profile (HTTP cache, service workers, cookies) instead of an empty one
+        self.profile = self.chrome_profiles.acquire()
+        if self.profile:
+            chrome_options.add_argument(f'--user-data-dir={self.profile.path}')
         
-        # Try to find Chrome/Chromium binary in multiple locations
-        chrome_found = False
+        # Performance log carries the Network.* events NetworkCapture reads
+        if self.capture_mode != 'dom':
+            chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
         
-        # 1. Try Nix store (Replit environment)
-        chromium_paths = sorted(glob.glob('/nix/store/*-chromium-*/bin/chromium'))
-        if chromium_paths:
-            chrome_options.binary_location = chromium_paths[-1]
-            print(f"Using Chromium from Nix: {chromium_paths[-1]}")
-            chrome_found = True
-        else:
-            # 2. Try standard Linux locations (Render/production)
-            standard_paths = [
-                '/usr/bin/google-chrome',
-                '/usr/bin/chromium',
-                '/usr/bin/chromium-browser',
-                '/opt/google/chrome/chrome',
-                '/opt/google/chrome/google-chrome'
-            ]
-            for path in standard_paths:
-                if os.path.exists(path):
-                    chrome_options.binary_location = path
-                    print(f"Using Chrome from standard location: {path}")
-                    chrome_found = True
-                    break
-        
-        if not chrome_found:
-            print("Chrome/Chromium binary not found in standard locations, using default")
-            
-        # Find chromedriver binary
-        chromedriver_path = None
-        
-        # 1. Check environment variable (Docker/Render)
-        env_chromedriver = os.environ.get('CHROMEDRIVER_PATH')
-        if env_chromedriver and os.path.exists(env_chromedriver):
-            chromedriver_path = env_chromedriver
-            print(f"Using ChromeDriver from environment: {chromedriver_path}")
-        # 2. Check Nix store (Replit)
-        else:
-            chromedriver_paths = sorted(glob.glob('/nix/store/*-chromedriver-*/bin/chromedriver'))
-            if chromedriver_paths:
-                chromedriver_path = chromedriver_paths[-1]
-                print(f"Using ChromeDriver from Nix: {chromedriver_path}")
-            # 3. Check standard locations
-            elif os.path.exists('/usr/local/bin/chromedriver'):
-                chromedriver_path = '/usr/local/bin/chromedriver'
-                print(f"Using ChromeDriver from /usr/local/bin")
-            elif os.path.exists('/usr/bin/chromedriver'):
-                chromedriver_path = '/usr/bin/chromedriver'
-                print(f"Using ChromeDriver from /usr/bin")
+        # Note: Images can't be blocked wholesale, because Dreamina only populates
+        # generated image URLs in the src attributes once they load. Trackers,
+        # fonts and media are blocked over CDP instead, once the driver is up.
         
         try:
-            if chromedriver_path:
-                service = Service(chromedriver_path)
-                self.driver = webdriver.Chrome(service=service, options=chrome_options)
-            else:
-                # Fallback to webdriver-manager
-                print("Using webdriver-manager for ChromeDriver")
-                self.driver = webdriver.Chrome(
-                    service=Service(ChromeDriverManager().install()),
-                    options=chrome_options
-                )
+            # Binaries are located once per process (see browser_binaries.py)
+            binaries = resolve_binaries()
+            if binaries['chrome']:
+                chrome_options.binary_location = binaries['chrome']
+            with metrics.stage('driver_start'):
+                self.driver = webdriver.Chrome(service=get_driver_service(), options=chrome_options)
         except Exception as e:
+            if self.profile:
+                self.profile.release()
+                self.profile = None
             raise Exception(f"Failed to initialize Chrome driver: {str(e)}")
         
+        self.resource_blocker.apply(self.driver)
+        self.waits = WaitEngine(self.driver)
         return self.driver
     
     
@@ -154,6 +287,8 @@ class DreaminaService:
         """Perform automated login using email and password"""
         try:
             driver = self.init_driver()
+            self.waits.reset()
+            self.debug_request = self.debug_store.begin('login')
             print("=" * 60)
             print("STARTING AUTOMATED EMAIL LOGIN")
             print(f"Email: {email[:3]}...{email[-10:]}")  # Show partial email for debugging
@@ -162,17 +297,14 @@ class DreaminaService:
             # Navigate to Dreamina login page
             print(f"Navigating to: {self.login_url}")
             driver.get(self.login_url)
-            print(f"Current URL after navigation: {driver.current_url}")
+            login_page_url = driver.current_url
+            print(f"Current URL after navigation: {login_page_url}")
             print(f"Page title: {driver.title}")
             
-            # Save initial screenshot
-            try:
-                driver.save_screenshot('/tmp/login_step1_homepage.png')
-                print("✓ Saved screenshot: /tmp/login_step1_homepage.png")
-            except Exception as e:
-                print(f"Could not save screenshot: {e}")
+            self._debug('login_step1_homepage')
             
-            time.sleep(3)
+            self.waits.until('login page rendered', all_of(document_ready(), dom_quiet(300)), timeout=5)
+            self.resource_blocker.measure(driver, 'login')
             
             # Look for and click the "Continue with email" or "Email" button
             print("\nStep 1: Looking for email login option...")
@@ -187,38 +319,23 @@ class DreaminaService:
                 (By.XPATH, "//div[contains(@class, 'email')]//button"),
             ]
             
-            for i, (selector_type, selector_value) in enumerate(email_button_selectors):
+            email_btn = self._resolve('email_button', email_button_selectors, timeout=8)
+            if email_btn is not None:
                 try:
-                    print(f"  Trying selector {i+1}/{len(email_button_selectors)}: {selector_value}")
-                    email_btn = WebDriverWait(driver, 5).until(
-                        EC.element_to_be_clickable((selector_type, selector_value))
-                    )
                     driver.execute_script("arguments[0].click();", email_btn)
                     print("  ✓ Clicked 'Continue with email' button")
                     email_button_found = True
                     
-                    # Save screenshot after clicking
-                    try:
-                        driver.save_screenshot('/tmp/login_step2_after_email_button.png')
-                        print("  ✓ Saved screenshot: /tmp/login_step2_after_email_button.png")
-                    except:
-                        pass
+                    self._debug('login_step2_after_email_button')
                     
-                    time.sleep(2)
-                    break
-                except (TimeoutException, Exception) as e:
-                    print(f"  ✗ Selector failed: {str(e)[:50]}")
-                    continue
+                    self.waits.until('email form shown', element_enabled((By.CSS_SELECTOR, "input")), timeout=5)
+                except Exception as e:
+                    print(f"  ✗ Interaction failed: {str(e)[:50]}")
             
             if not email_button_found:
                 print("  ⚠ Could not find 'Continue with email' button")
                 print("  → Trying to find email input directly...")
-                # Save screenshot for debugging
-                try:
-                    driver.save_screenshot('/tmp/login_step2_no_email_button.png')
-                    print("  ✓ Saved screenshot: /tmp/login_step2_no_email_button.png")
-                except:
-                    pass
+                self._debug('login_step2_no_email_button')
             
             # Enter email
             print("\nStep 2: Entering email...")
@@ -231,69 +348,38 @@ class DreaminaService:
                 (By.CSS_SELECTOR, "input[type='text']"),
             ]
             
-            for i, (selector_type, selector_value) in enumerate(email_selectors):
+            email_input = self._resolve('email_input', email_selectors, timeout=8)
+            if email_input is not None:
                 try:
-                    print(f"  Trying selector {i+1}/{len(email_selectors)}: {selector_value}")
-                    email_input = WebDriverWait(driver, 5).until(
-                        EC.element_to_be_clickable((selector_type, selector_value))
-                    )
                     email_input.clear()
                     email_input.send_keys(email)
                     print(f"  ✓ Email entered: {email[:3]}...{email[-10:]}")
                     email_input_found = True
                     
-                    # Save screenshot after entering email
-                    try:
-                        driver.save_screenshot('/tmp/login_step3_email_entered.png')
-                        print("  ✓ Saved screenshot: /tmp/login_step3_email_entered.png")
-                    except:
-                        pass
+                    self._debug('login_step3_email_entered')
                     
-                    time.sleep(1)
-                    break
-                except (TimeoutException, Exception) as e:
-                    print(f"  ✗ Selector failed: {str(e)[:50]}")
-                    continue
+                    self.waits.until('email accepted', value_equals(email_input, email), timeout=2)
+                except Exception as e:
+                    print(f"  ✗ Interaction failed: {str(e)[:50]}")
             
             if not email_input_found:
                 print("  ✗ FAILED: Could not find email input field")
                 print("\n  🔍 DEBUG: Inspecting page for all input fields...")
                 
-                # Debug: List all input elements on the page
-                try:
-                    all_inputs = driver.find_elements(By.TAG_NAME, "input")
-                    print(f"  Found {len(all_inputs)} input elements total:")
-                    for idx, inp in enumerate(all_inputs[:10], 1):  # Show first 10
-                        inp_type = inp.get_attribute('type') or 'no-type'
-                        inp_placeholder = inp.get_attribute('placeholder') or 'no-placeholder'
-                        inp_name = inp.get_attribute('name') or 'no-name'
-                        is_visible = inp.is_displayed()
-                        print(f"    {idx}. Type: {inp_type}, Placeholder: {inp_placeholder}, Name: {inp_name}, Visible: {is_visible}")
-                except Exception as e:
-                    print(f"  Could not inspect inputs: {e}")
-                
-                # Debug: List all buttons
+                # Debug: List input fields and buttons (first 10 of each) in one round trip
                 try:
-                    all_buttons = driver.find_elements(By.TAG_NAME, "button")
-                    print(f"\n  Found {len(all_buttons)} button elements total:")
-                    for idx, btn in enumerate(all_buttons[:10], 1):  # Show first 10
-                        btn_text = btn.text[:50] if btn.text else 'no-text'
-                        btn_type = btn.get_attribute('type') or 'no-type'
-                        is_visible = btn.is_displayed()
-                        print(f"    {idx}. Text: '{btn_text}', Type: {btn_type}, Visible: {is_visible}")
+                    snap = dom_probe.snapshot(driver, max_buttons=10, max_inputs=10)
+                    print(f"  Found {snap['input_total']} input elements total:")
+                    for line in dom_probe.describe_inputs(snap):
+                        print(f"    {line}")
+                    print(f"\n  Found {snap['button_total']} button elements total:")
+                    for line in dom_probe.describe_buttons(snap):
+                        print(f"    {line}")
                 except Exception as e:
-                    print(f"  Could not inspect buttons: {e}")
+                    print(f"  Could not inspect page: {e}")
                 
-                driver.save_screenshot('/tmp/login_error_no_email_input.png')
-                # Save HTML for debugging
-                try:
-                    with open('/tmp/login_error_no_email_input.html', 'w', encoding='utf-8') as f:
-                        f.write(driver.page_source)
-                    print("  Debug HTML saved to /tmp/login_error_no_email_input.html")
-                except:
-                    pass
-                    
-                raise Exception("Could not find email input field. Screenshot saved to /tmp/login_error_no_email_input.png")
+                self._debug('login_error_no_email_input', failure=True, html=True)
+                raise Exception(f"Could not find email input field. Debug artifacts: {self._debug_url()}")
             
             # Enter password
             print("\nStep 3: Entering password...")
@@ -304,34 +390,24 @@ class DreaminaService:
                 (By.CSS_SELECTOR, "input[name='password']"),
             ]
             
-            for i, (selector_type, selector_value) in enumerate(password_selectors):
+            password_input = self._resolve('password_input', password_selectors, timeout=5)
+            if password_input is not None:
                 try:
-                    print(f"  Trying selector {i+1}/{len(password_selectors)}: {selector_value}")
-                    password_input = WebDriverWait(driver, 5).until(
-                        EC.element_to_be_clickable((selector_type, selector_value))
-                    )
                     password_input.clear()
                     password_input.send_keys(password)
                     print("  ✓ Password entered (hidden)")
                     password_input_found = True
                     
-                    # Save screenshot after entering password
-                    try:
-                        driver.save_screenshot('/tmp/login_step4_password_entered.png')
-                        print("  ✓ Saved screenshot: /tmp/login_step4_password_entered.png")
-                    except:
-                        pass
+                    self._debug('login_step4_password_entered')
                     
-                    time.sleep(1)
-                    break
-                except (TimeoutException, Exception) as e:
-                    print(f"  ✗ Selector failed: {str(e)[:50]}")
-                    continue
+                    self.waits.until('password accepted', value_equals(password_input, password), timeout=2)
+                except Exception as e:
+                    print(f"  ✗ Interaction failed: {str(e)[:50]}")
             
             if not password_input_found:
                 print("  ✗ FAILED: Could not find password input field")
-                driver.save_screenshot('/tmp/login_error_no_password_input.png')
-                raise Exception("Could not find password input field. Screenshot saved to /tmp/login_error_no_password_input.png")
+                self._debug('login_error_no_password_input', failure=True)
+                raise Exception(f"Could not find password input field. Debug artifacts: {self._debug_url()}")
             
             # Click login/submit button
             print("\nStep 4: Clicking login button...")
@@ -345,75 +421,56 @@ class DreaminaService:
                 (By.CSS_SELECTOR, "button[class*='login']"),
             ]
             
-            for i, (selector_type, selector_value) in enumerate(login_button_selectors):
+            login_btn = self._resolve('login_button', login_button_selectors, timeout=8)
+            if login_btn is not None:
                 try:
-                    print(f"  Trying selector {i+1}/{len(login_button_selectors)}: {selector_value}")
-                    login_btn = WebDriverWait(driver, 5).until(
-                        EC.element_to_be_clickable((selector_type, selector_value))
-                    )
                     driver.execute_script("arguments[0].click();", login_btn)
                     print("  ✓ Login button clicked")
                     login_button_found = True
                     
-                    # Save screenshot after clicking
-                    try:
-                        driver.save_screenshot('/tmp/login_step5_button_clicked.png')
-                        print("  ✓ Saved screenshot: /tmp/login_step5_button_clicked.png")
-                    except:
-                        pass
+                    self._debug('login_step5_button_clicked')
                     
-                    break
-                except (TimeoutException, Exception) as e:
-                    print(f"  ✗ Selector failed: {str(e)[:50]}")
-                    continue
+                except Exception as e:
+                    print(f"  ✗ Interaction failed: {str(e)[:50]}")
             
             if not login_button_found:
                 print("  ✗ FAILED: Could not find or click login button")
-                driver.save_screenshot('/tmp/login_error_no_login_button.png')
-                raise Exception("Could not find or click login button. Screenshot saved to /tmp/login_error_no_login_button.png")
+                self._debug('login_error_no_login_button', failure=True)
+                raise Exception(f"Could not find or click login button. Debug artifacts: {self._debug_url()}")
             
             # Wait for login to complete
             print("\nStep 5: Waiting for login to complete...")
-            time.sleep(5)
+            self.waits.until(
+                'login form dismissed',
+                any_of(url_changes(login_page_url), element_gone((By.CSS_SELECTOR, "input[type='password']"))),
+                timeout=15
+            )
+            self.waits.until('post-login page settled', all_of(document_ready(), network_idle(500), dom_quiet(500)), timeout=5)
             
-            # Save screenshot after waiting
-            try:
-                driver.save_screenshot('/tmp/login_step6_after_wait.png')
-                print("✓ Saved screenshot: /tmp/login_step6_after_wait.png")
-            except:
-                pass
+            self._debug('login_step6_after_wait')
             
             # Check if login was successful
             current_url = driver.current_url
-            page_source = driver.page_source.lower()
             print(f"Current URL after login: {current_url}")
             print(f"Page title: {driver.title}")
             
             # Check for login-related keywords
-            login_keywords = ['sign in', 'log in', 'continue with google', 'continue with email']
-            found_keywords = [kw for kw in login_keywords if kw in page_source]
+            found_keywords = self._login_keywords_on_page()
             
             # Check if login was successful
             if not found_keywords:
                 print("=" * 60)
                 print("✓✓✓ LOGIN SUCCESSFUL! ✓✓✓")
                 print("=" * 60)
+                self.debug_store.finish(self.debug_request, 'success')
                 return True
             else:
-                # Save debug screenshot
                 print("=" * 60)
                 print("✗✗✗ LOGIN FAILED ✗✗✗")
                 print(f"Found login keywords: {found_keywords}")
                 print("=" * 60)
-                try:
-                    driver.save_screenshot('/tmp/login_failed.png')
-                    print("Debug screenshot saved to /tmp/login_failed.png")
-                    # Also save HTML
-                    with open('/tmp/login_failed.html', 'w', encoding='utf-8') as f:
-                        f.write(driver.page_source)
-                    print("Debug HTML saved to /tmp/login_failed.html")
-                except Exception as e:
-                    print(f"Could not save debug files: {e}")
+                self._debug('login_failed', failure=True, html=True)
+                self.debug_store.finish(self.debug_request, 'failure')
                 return False
                 
         except Exception as e:
@@ -421,19 +478,46 @@ class DreaminaService:
             print("✗✗✗ LOGIN EXCEPTION ✗✗✗")
             print(f"Error: {str(e)}")
             print("=" * 60)
-            # Save debug screenshot on error
-            try:
-                if self.driver:
-                    self.driver.save_screenshot('/tmp/login_exception.png')
-                    print("Debug screenshot saved to /tmp/login_exception.png")
-                    # Also save HTML
-                    with open('/tmp/login_exception.html', 'w', encoding='utf-8') as f:
-                        f.write(self.driver.page_source)
-                    print("Debug HTML saved to /tmp/login_exception.html")
-            except Exception as save_err:
-                print(f"Could not save debug files: {save_err}")
+            self._debug('login_exception', failure=True, html=True)
+            self.debug_store.finish(self.debug_request, 'failure')
             raise  # Re-raise the exception so we can see it in logs
     
+    def _resolve(self, step, selectors, timeout):
+        """Resolve a step's fallback selectors in one in-page polling loop.
+
+        Selectors are tried historically-best first and the winner is recorded.
+        """
+        selectors = self.selector_stats.order(step, selectors)
+        print(f"  Resolving {len(selectors)} selectors for {step} (timeout {timeout}s)")
+        started = time.monotonic()
+        try:
+            index, element = resolve_first(self.driver, selectors, timeout)
+        except Exception as e:
+            print(f"  ✗ Selector resolution error: {str(e)[:80]}")
+            metrics.SELECTOR_ATTEMPTS.inc(step=step, outcome='error')
+            return None
+        latency = time.monotonic() - started
+        metrics.SELECTOR_SECONDS.observe(latency, step=step)
+        if element is None:
+            print(f"  ✗ No selector matched within {timeout}s")
+            metrics.SELECTOR_ATTEMPTS.inc(step=step, outcome='miss')
+            self.selector_stats.record_miss(step)
+            return None
+        metrics.SELECTOR_ATTEMPTS.inc(step=step, outcome='hit')
+        print(f"  ✓ Matched selector {index + 1}/{len(selectors)} in {latency:.2f}s: {selectors[index][1]}")
+        self.selector_stats.record_hit(step, selectors[index][1], latency)
+        return element
+    
+    def _debug(self, name, failure=False, html=False):
+        """Capture debug artifacts for the current request if DREAMINA_DEBUG_LEVEL asks for them"""
+        files = self.debug_store.capture(self.debug_request, name, self.driver, failure=failure, html=html)
+        if files:
+            print(f"  📸 Debug capture: {', '.join(files)} ({self.debug_request})")
+        return files
+    
+    def _debug_url(self):
+        return f"/api/debug/requests/{self.debug_request}"
+    
     def check_authentication(self):
         """Check if authenticated, and perform login if needed"""
         try:
@@ -453,208 +537,289 @@ class DreaminaService:
                 time.sleep(1)
         return None
     
-    def generate_image(self, prompt, aspect_ratio='1:1', quality='high', model='image_4.0'):
+    def _open_workspace(self):
+        """Navigate to the home page and make sure the AI Image section is active.
+
+        Returns False (and forgets the login) if Dreamina redirected to the login page.
+        """
+        driver = self.driver
+        driver.get(self.home_url)
+        self.waits.until('workspace rendered', all_of(document_ready(), dom_quiet(300)), timeout=8)
+        self.resource_blocker.measure(driver, 'workspace')
+        
+        print(f"Navigated to: {driver.current_url}")
+        print(f"Page title: {driver.title}")
+        
+        if '/login' in driver.current_url:
+            print("✗ Session expired: workspace redirected to the login page")
+            self.is_authenticated = False
+            return False
+        
+        # Ensure we're on the AI Image section
         try:
-            # Ensure we're authenticated before generating
-            if not self.ensure_authenticated():
-                return {
-                    'status': 'error',
-                    'message': 'Authentication failed. Cannot generate image.'
-                }
-            
-            driver = self.init_driver()
-            
-            # Navigate to home page
-            driver.get(self.home_url)
-            time.sleep(2)
-            
-            print(f"Navigated to: {driver.current_url}")
-            print(f"Page title: {driver.title}")
+            # Try to click "AI Image" button if visible (to ensure correct section is active)
+            ai_image_selectors = [
+                (By.XPATH, "//button[contains(text(), 'AI Image')]"),
+                (By.XPATH, "//*[contains(text(), 'AI Image')]"),
+            ]
+            ai_image_btn = self._resolve('ai_image_tab', ai_image_selectors, timeout=3)
+            if ai_image_btn is not None:
+                driver.execute_script("arguments[0].click();", ai_image_btn)
+                print("Clicked 'AI Image' section")
+                self.waits.until('AI Image section settled', dom_quiet(200), timeout=2)
+        except Exception as e:
+            # Not critical if this fails - the page might already be on the right section
+            print(f"Note: Could not click AI Image section (might already be active): {str(e)}")
+        return True
+    
+    def _open_authenticated_workspace(self):
+        """Open the workspace, logging in again once if the session expired since the last request"""
+        if self._open_workspace():
+            return True
+        print("Re-authenticating...")
+        debug_request = self.debug_request
+        authenticated = self.ensure_authenticated()
+        # login_with_email records into its own debug request; keep writing to the caller's
+        self.debug_request = debug_request
+        return authenticated and self._open_workspace()
+    
+    def _start_capture(self):
+        """Start listening for Dreamina API responses, or return None in DOM-only mode"""
+        if self.capture_mode == 'dom':
+            return None
+        try:
+            capture = NetworkCapture(self.driver, IMAGE_URL_MARKERS)
+            capture.start()
+            return capture
+        except Exception as e:
+            print(f"Network capture unavailable, falling back to DOM scan: {str(e)[:80]}")
+            return None
+    
+    def _submit_prompt(self, prompt):
+        """Type the prompt and click Generate; returns None on success or an error result"""
+        driver = self.driver
+        
+        # Find and fill prompt input - optimized with specific selectors first
+        prompt_entered = False
+        input_selectors = [
+            (By.CSS_SELECTOR, "textarea"),
+            (By.CSS_SELECTOR, "input[type='text']"),
+        ]
+        
+        prompt_input = self._resolve('prompt_input', input_selectors, timeout=8)
+        if prompt_input is not None:
+            try:
+                prompt_input.click()
+                prompt_input.clear()
+                prompt_input.send_keys(prompt)
+                prompt_entered = True
+                print("Prompt entered")
+                self._debug('prompt_entered')
+            except (StaleElementReferenceException, Exception) as e:
+                print(f"Could not type prompt: {str(e)[:80]}")
+        
+        if not prompt_entered:
+            self._debug('prompt_input_missing', failure=True, html=True)
+            return {
+                'status': 'error',
+                'message': 'Failed to enter prompt. Please check if authentication is valid.',
+                'debug_id': self.debug_request
+            }
+        
+        # The Generate button enables once the front-end has picked up the prompt;
+        # the clickable waits below then cover the button itself
+        print("Waiting for Generate button to become available...")
+        self.waits.until('prompt accepted', value_equals(prompt_input, prompt), timeout=3)
+        button_clicked = False
+        
+        # Updated button selectors for current Dreamina page (October 2025)
+        button_selectors = [
+            # Try standard Generate button first
+            (By.XPATH, "//button[contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'generate')]"),
+            (By.CSS_SELECTOR, "button[class*='generate']"),
+            (By.CSS_SELECTOR, "button[class*='Generate']"),
+            # Try blue primary button (common pattern for Generate CTA)
+            (By.XPATH, "//button[@type='submit']"),
+            (By.XPATH, "//button[contains(@class, 'primary')]"),
+            (By.XPATH, "//button[contains(@class, 'btn-primary')]"),
+            # Fallback to any clickable button in workspace area
+            (By.CSS_SELECTOR, "button[class*='submit']"),
+        ]
+        
+        generate_button = self._resolve('generate_button', button_selectors, timeout=10)
+        if generate_button is not None:
+            try:
+                # Scroll button into view first
+                driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", generate_button)
+                # Use JavaScript click for reliability
+                driver.execute_script("arguments[0].click();", generate_button)
+                button_clicked = True
+                print("✓ Generate button clicked")
+                self._debug('generate_clicked')
+            except (StaleElementReferenceException, Exception) as e:
+                print(f"Could not click Generate button: {str(e)[:80]}")
+        
+        if not button_clicked:
+            # Enhanced debug: Save screenshot and button info
+            self._debug('generate_button_missing', failure=True, html=True)
+            try:
+                # Log the first 15 buttons
+                snap = dom_probe.snapshot(driver, max_buttons=15)
+                button_info = dom_probe.describe_buttons(snap)
+                debug_msg = "\n".join(button_info) if button_info else "No buttons found"
+                print(f"Available buttons ({snap['button_total']} total):\n{debug_msg}")
+            except Exception as debug_err:
+                print(f"Debug error: {str(debug_err)}")
             
-            # Ensure we're on the AI Image section
+            return {
+                'status': 'error',
+                'message': 'Failed to click generate button. Check logs for button details.',
+                'debug_id': self.debug_request
+            }
+        
+        return None
+    
+    def generate_image(self, prompt, aspect_ratio='1:1', quality='high', model='image_4.0', on_event=None,
+                       min_images=IMAGES_PER_GENERATION):
+        """Generate images for prompt and return the result dict.
+        
+        Returns as soon as min_images new results exist (all of them by default).
+        on_event(event, data) is called with progress as it happens: 'started',
+        'prompt_entered', 'image' once per new result URL as soon as it is
+        detected, then 'done' or 'error' with the result.
+        """
+        def emit(event, **data):
+            if on_event is None:
+                return
             try:
-                # Try to click "AI Image" button if visible (to ensure correct section is active)
-                ai_image_selectors = [
-                    (By.XPATH, "//button[contains(text(), 'AI Image')]"),
-                    (By.XPATH, "//*[contains(text(), 'AI Image')]"),
-                ]
-                for selector_type, selector_value in ai_image_selectors:
-                    try:
-                        ai_image_btn = WebDriverWait(driver, 3).until(
-                            EC.element_to_be_clickable((selector_type, selector_value))
-                        )
-                        driver.execute_script("arguments[0].click();", ai_image_btn)
-                        print("Clicked 'AI Image' section")
-                        time.sleep(0.5)
-                        break
-                    except:
-                        continue
+                on_event(event, data)
             except Exception as e:
-                # Not critical if this fails - the page might already be on the right section
-                print(f"Note: Could not click AI Image section (might already be active): {str(e)}")
-            
-            # Find and fill prompt input - optimized with specific selectors first
-            prompt_entered = False
-            input_selectors = [
-                (By.CSS_SELECTOR, "textarea"),
-                (By.CSS_SELECTOR, "input[type='text']"),
-            ]
-            
-            for selector_type, selector_value in input_selectors:
-                try:
-                    prompt_input = WebDriverWait(driver, 8).until(
-                        EC.element_to_be_clickable((selector_type, selector_value))
-                    )
-                    prompt_input.click()
-                    time.sleep(0.1)
-                    prompt_input.clear()
-                    prompt_input.send_keys(prompt)
-                    prompt_entered = True
-                    print(f"Prompt entered using {selector_type}")
-                    break
-                except (StaleElementReferenceException, TimeoutException, Exception) as e:
-                    continue
+                print(f"Progress callback failed on '{event}': {str(e)[:80]}")
+        
+        with metrics.STAGE_SECONDS.time(stage='generate_total'):
+            result = self._generate_image(prompt, aspect_ratio, quality, model, emit,
+                                          max(1, min(IMAGES_PER_GENERATION, min_images)))
+        metrics.GENERATIONS.inc(model=model, status=result.get('status', 'error'))
+        get_health_state().record_generation(result.get('status'))
+        emit('done' if result.get('status') == 'success' else 'error', result=result)
+        return result
+    
+    def _generate_image(self, prompt, aspect_ratio, quality, model, emit, min_images):
+        try:
+            emit('started', prompt=prompt, model=model, aspect_ratio=aspect_ratio, quality=quality)
             
-            if not prompt_entered:
+            # Ensure we're authenticated before generating
+            with metrics.stage('authenticate'):
+                authenticated = self.ensure_authenticated()
+            if not authenticated:
                 return {
                     'status': 'error',
-                    'message': 'Failed to enter prompt. Please check if authentication is valid.'
+                    'message': 'Authentication failed. Cannot generate image.'
                 }
             
-            # Wait for Generate button to become active after entering prompt
-            # The button may need time to enable after prompt is entered
-            print("Waiting for Generate button to become available...")
-            time.sleep(1.5)  # Give page time to fully load and enable button after entering prompt
-            button_clicked = False
-            
-            # Updated button selectors for current Dreamina page (October 2025)
-            button_selectors = [
-                # Try standard Generate button first
-                (By.XPATH, "//button[contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'generate')]"),
-                (By.CSS_SELECTOR, "button[class*='generate']"),
-                (By.CSS_SELECTOR, "button[class*='Generate']"),
-                # Try blue primary button (common pattern for Generate CTA)
-                (By.XPATH, "//button[@type='submit']"),
-                (By.XPATH, "//button[contains(@class, 'primary')]"),
-                (By.XPATH, "//button[contains(@class, 'btn-primary')]"),
-                # Fallback to any clickable button in workspace area
-                (By.CSS_SELECTOR, "button[class*='submit']"),
-            ]
-            
-            for selector_type, selector_value in button_selectors:
-                try:
-                    generate_button = WebDriverWait(driver, 8).until(
-                        EC.element_to_be_clickable((selector_type, selector_value))
-                    )
-                    # Scroll button into view first
-                    driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", generate_button)
-                    time.sleep(0.3)
-                    # Use JavaScript click for reliability
-                    driver.execute_script("arguments[0].click();", generate_button)
-                    button_clicked = True
-                    print(f"✓ Button clicked using selector: {selector_value}")
-                    break
-                except (StaleElementReferenceException, TimeoutException, Exception) as e:
-                    continue
+            driver = self.init_driver()
+            self.waits.reset()
+            self.debug_request = self.debug_store.begin('generate')
             
-            if not button_clicked:
-                # Enhanced debug: Save screenshot and button info
-                try:
-                    # Take screenshot for debugging
-                    screenshot_path = '/tmp/dreamina_debug.png'
-                    driver.save_screenshot(screenshot_path)
-                    print(f"Debug screenshot saved to: {screenshot_path}")
-                    
-                    # Save page HTML for analysis
-                    html_path = '/tmp/dreamina_debug.html'
-                    with open(html_path, 'w', encoding='utf-8') as f:
-                        f.write(driver.page_source)
-                    print(f"Debug HTML saved to: {html_path}")
-                    
-                    # Find all buttons and log them
-                    all_buttons = driver.find_elements(By.TAG_NAME, "button")
-                    button_info = []
-                    for i, btn in enumerate(all_buttons[:15]):  # Increased limit to 15
-                        try:
-                            text = btn.text[:80] if btn.text else "No text"
-                            btn_class = btn.get_attribute('class')
-                            classes = btn_class[:80] if btn_class else "No class"
-                            btn_type = btn.get_attribute('type') or "no type"
-                            visible = btn.is_displayed()
-                            button_info.append(f"[{i}] Text:'{text}' | Class:'{classes}' | Type:'{btn_type}' | Visible:{visible}")
-                        except Exception as btn_err:
-                            button_info.append(f"[{i}] Error reading button: {str(btn_err)}")
-                    
-                    debug_msg = "\n".join(button_info) if button_info else "No buttons found"
-                    print(f"Available buttons ({len(all_buttons)} total):\n{debug_msg}")
-                except Exception as debug_err:
-                    print(f"Debug error: {str(debug_err)}")
-                
+            # Navigate to the workspace and submit the prompt
+            with metrics.stage('open_workspace'):
+                workspace_opened = self._open_authenticated_workspace()
+            self._debug('workspace_opened')
+            if not workspace_opened:
+                metrics.STAGE_FAILURES.inc(stage='open_workspace')
+                self.debug_store.finish(self.debug_request, 'failure')
                 return {
                     'status': 'error',
-                    'message': 'Failed to click generate button. Debug files saved to /tmp/dreamina_debug.png and /tmp/dreamina_debug.html. Check logs for button details.'
+                    'message': 'Session expired and re-authentication failed. Cannot generate image.'
                 }
             
+            # Start listening for API responses before the click that triggers them
+            capture = self._start_capture()
+            with metrics.stage('submit_prompt'):
+                error = self._submit_prompt(prompt)
+            if error:
+                metrics.STAGE_FAILURES.inc(stage='submit_prompt')
+                self.debug_store.finish(self.debug_request, 'failure')
+                return error
+            emit('prompt_entered')
+            
             # Capture existing images BEFORE generation
             print("Capturing existing images...")
             existing_image_urls = set()
             try:
-                existing_images = driver.find_elements(By.TAG_NAME, "img")
-                for img in existing_images:
-                    try:
-                        src = img.get_attribute('src')
-                        if src and ('ibyteimg.com' in src or 'bytedance' in src or 'capcut' in src):
-                            existing_image_urls.add(src)
-                    except:
-                        continue
+                existing_image_urls = set(dom_probe.snapshot(driver, IMAGE_URL_MARKERS)['images'])
                 print(f"Found {len(existing_image_urls)} existing images")
             except Exception as e:
                 print(f"Warning: Could not capture existing images: {str(e)}")
             
-            # Optimized waiting for image generation
-            print("Waiting for generation...")
-            max_wait_time = 35  # Reduced from 45s
-            wait_interval = 2   # Check every 2 seconds (reduced from 4s)
-            total_waited = 0
-            
-            # Initial wait for generation to start
-            time.sleep(3)  # Reduced from 5s
-            total_waited += 3
+            # Check sparsely until this model usually finishes, densely around it (see adaptive_polling.py)
+            schedule = PollSchedule.for_generation(self.duration_model, model, aspect_ratio)
+            print(f"Waiting for generation ({schedule.describe()})...")
+            poll_started = time.monotonic()
+            poll_iterations = 0
             
             new_image_urls = []
-            while total_waited < max_wait_time:
+            streamed = set()
+            failure_reported = False
+            while True:
+                poll_iterations += 1
                 try:
-                    current_images = driver.find_elements(By.TAG_NAME, "img")
-                    new_image_urls = []
+                    if capture:
+                        capture.poll()
+                        if capture.failed and not failure_reported:
+                            failure_reported = True
+                            print("✗ Dreamina reported the generation task as failed")
+                            # Only trust that verdict on its own in cdp mode; auto keeps scanning the DOM
+                            if self.capture_mode == 'cdp':
+                                break
+                        new_image_urls = capture.new_image_urls(existing_image_urls)
                     
-                    for img in current_images:
-                        try:
-                            src = img.get_attribute('src')
-                            if src and ('ibyteimg.com' in src or 'bytedance' in src or 'capcut' in src):
-                                if src not in existing_image_urls:
-                                    new_image_urls.append(src)
-                        except:
-                            continue
+                    # cdp mode still scans the page when capture couldn't start
+                    if (capture is None or self.capture_mode != 'cdp') and len(new_image_urls) < IMAGES_PER_GENERATION:
+                        snap = dom_probe.snapshot(driver, IMAGE_URL_MARKERS)
+                        new_image_urls = [src for src in snap['images'] if src not in existing_image_urls]
                     
-                    print(f"[{total_waited}s] New images: {len(new_image_urls)}")
+                    elapsed = time.monotonic() - poll_started
+                    print(f"[{elapsed:.1f}s] New images: {len(new_image_urls)}")
+                    for url in new_image_urls:
+                        if url not in streamed:
+                            emit('image', url=url, index=len(streamed), elapsed=round(elapsed, 2))
+                            streamed.add(url)
                     
-                    # Dreamina generates 4 images
-                    if len(new_image_urls) >= 4:
-                        print(f"✓ Generated {len(new_image_urls)} images in {total_waited}s")
+                    if len(new_image_urls) >= min_images:
+                        print(f"✓ Generated {len(new_image_urls)} images in {elapsed:.1f}s")
                         break
-                    
-                    # Continue waiting
-                    time.sleep(wait_interval)
-                    total_waited += wait_interval
-                    
                 except Exception as e:
                     print(f"Check error: {str(e)}")
-                    time.sleep(wait_interval)
-                    total_waited += wait_interval
+                
+                delay = schedule.next_delay(time.monotonic() - poll_started)
+                if delay <= 0:
+                    break
+                # Network capture wakes up as soon as the backend reports results
+                if capture and not capture.completed and not capture.failed:
+                    capture.wait(delay, min_images, existing_image_urls)
+                else:
+                    time.sleep(delay)
+            
+            if len(new_image_urls) >= IMAGES_PER_GENERATION:
+                self.duration_model.record(model, aspect_ratio, time.monotonic() - poll_started)
+            elif 0 < len(new_image_urls) < min_images and not (capture and capture.failed):
+                # Still rendering at the deadline: only a lower bound, kept apart from the samples.
+                # No images at all says nothing about timing (stuck or failed task), so it isn't recorded.
+                self.duration_model.record_censored(model, aspect_ratio, time.monotonic() - poll_started)
+            total_waited = round(time.monotonic() - poll_started)
+            print(f"Condition waits: {self.waits.total_waited()}s across {len(self.waits.records)} steps")
+            metrics.STAGE_SECONDS.observe(time.monotonic() - poll_started, stage='image_wait')
+            metrics.POLL_ITERATIONS.observe(poll_iterations)
+            metrics.IMAGES_FOUND.observe(len(new_image_urls))
+            if len(new_image_urls) < min_images:
+                metrics.STAGE_FAILURES.inc(stage='image_wait')
             
-            # Return results - require at least 4 images for success
-            if len(new_image_urls) >= 4:
+            # Return results - require at least min_images images for success
+            if len(new_image_urls) >= min_images:
                 print(f"✓ Success: {len(new_image_urls)} images generated in {total_waited}s")
+                self._debug('images_ready')
+                self.debug_store.finish(self.debug_request, 'success')
                 return {
                     'status': 'success',
                     'prompt': prompt,
@@ -667,19 +832,16 @@ class DreaminaService:
                 }
             else:
                 # Image detection failed - save debug info
+                self._debug('images_missing', failure=True, html=True)
+                self.debug_store.finish(self.debug_request, 'failure')
                 try:
-                    screenshot_path = '/tmp/dreamina_debug.png'
-                    driver.save_screenshot(screenshot_path)
-                    print(f"Debug screenshot saved to: {screenshot_path}")
-                    
-                    html_path = '/tmp/dreamina_debug.html'
-                    with open(html_path, 'w', encoding='utf-8') as f:
-                        f.write(driver.page_source)
-                    print(f"Debug HTML saved to: {html_path}")
-                    
                     # Log all images found
-                    all_imgs = driver.find_elements(By.TAG_NAME, "img")
-                    print(f"Total <img> elements found: {len(all_imgs)}")
+                    snap = dom_probe.snapshot(driver, IMAGE_URL_MARKERS)
+                    print(f"Total <img> elements found: {snap['img_total']} ({len(snap['images'])} result-like) on {snap['url']}")
+                    if capture:
+                        print(f"Network capture: {capture.responses_seen} API responses, "
+                              f"task={capture.own_task_id}, completed={capture.completed}, failed={capture.failed}, "
+                              f"{len(capture.early_urls)} URLs from before the submit response ignored")
                     print(f"Existing images (before generation): {len(existing_image_urls)}")
                     print(f"New images detected: {len(new_image_urls)}")
                     if new_image_urls:
@@ -690,21 +852,205 @@ class DreaminaService:
                 if new_image_urls:
                     return {
                         'status': 'error',
-                        'message': f'Only {len(new_image_urls)} images generated (expected 4). Generation may have been incomplete. Debug files saved to /tmp/dreamina_debug.png'
+                        'message': f'Only {len(new_image_urls)} images generated (expected {min_images}). Generation may have been incomplete.',
+                        'debug_id': self.debug_request
                     }
                 else:
                     return {
                         'status': 'error',
-                        'message': f'No images generated after {total_waited}s. This could be: 1) Authentication failed/expired, 2) Generation still in progress, 3) Page structure changed. Debug files saved to /tmp/dreamina_debug.png and /tmp/dreamina_debug.html'
+                        'message': f'No images generated after {total_waited}s. This could be: 1) Authentication failed/expired, 2) Generation still in progress, 3) Page structure changed.',
+                        'debug_id': self.debug_request
                     }
                 
         except Exception as e:
+            self._debug('generation_exception', failure=True, html=True)
+            self.debug_store.finish(self.debug_request, 'failure')
             return {
                 'status': 'error',
                 'message': f'Image generation error: {str(e)}'
             }
     
     
+    def is_healthy(self):
+        """Cheap liveness probe used before handing a pooled driver out again"""
+        if self.driver is None:
+            return False
+        try:
+            current_url = self.driver.current_url
+        except Exception as e:
+            print(f"Driver health check failed: {str(e)[:80]}")
+            return False
+        if '/login' in current_url:
+            # Dreamina dropped the session; a fresh browser re-authenticates from the saved session
+            print("Driver health check failed: session expired (on the login page)")
+            self.is_authenticated = False
+            return False
+        return True
+
+    def generate_batch(self, specs, max_in_flight=None):
+        """Generate many prompts in one logged-in workspace, yielding results as they finish.
+
+        specs is a list of dicts with prompt and optional aspect_ratio, quality
+        and model. Up to max_in_flight prompts are submitted before waiting, so
+        entering the next prompt overlaps with the previous generation. Each
+        prompt's images are matched to it by the task id in its submit response
+        (network capture); if that id never shows up, new images on the page are
+        handed out in submission order instead, which can mix up prompts that
+        are in flight together. In auto mode the same fallback applies when a
+        task has reported no images by half its deadline, since generate_image
+        also scans the page. Items are checked and timed out on the learned
+        schedule for their model (see adaptive_polling.py). Each yielded dict
+        has the same shape as a generate_image result plus the item's index
+        and matched_by ('task_id' or 'submission_order').
+        """
+        def item_result(item, status, message=None):
+            spec = item['spec']
+            result = {
+                'index': item['index'],
+                'status': status,
+                'prompt': spec['prompt'],
+                'model': spec.get('model', 'image_4.0'),
+                'aspect_ratio': spec.get('aspect_ratio', '1:1'),
+                'quality': spec.get('quality', 'high')
+            }
+            if status == 'success':
+                result['images'] = item['urls']
+                result['count'] = len(item['urls'])
+                result['generation_time'] = f"{round(time.monotonic() - item['submitted_at'])}s"
+                result['matched_by'] = 'task_id' if item['task_id'] else 'submission_order'
+            else:
+                result['message'] = message
+            return result
+        
+        if not self.ensure_authenticated():
+            for index, spec in enumerate(specs):
+                yield item_result({'index': index, 'spec': spec}, 'error', 'Authentication failed. Cannot generate image.')
+            return
+        
+        driver = self.init_driver()
+        self.waits.reset()
+        self.debug_request = self.debug_store.begin('batch')
+        if not self._open_authenticated_workspace():
+            self.debug_store.finish(self.debug_request, 'failure')
+            for index, spec in enumerate(specs):
+                yield item_result({'index': index, 'spec': spec}, 'error', 'Session expired and re-authentication failed. Cannot generate image.')
+            return
+        seen_urls = set(dom_probe.snapshot(driver, IMAGE_URL_MARKERS)['images'])
+        capture = self._start_capture()
+        if max_in_flight is None:
+            # Without task ids, overlapping prompts can't be told apart, so run them one at a time
+            max_in_flight = int(os.environ.get('DREAMINA_BATCH_MAX_IN_FLIGHT', 2 if capture else 1))
+        max_in_flight = max(1, max_in_flight)
+        pending = []
+        
+        def drain(block):
+            """Collect each pending prompt's images; yield finished items"""
+            while pending:
+                if capture:
+                    try:
+                        capture.poll()
+                    except Exception as e:
+                        print(f"Batch capture error: {str(e)}")
+                    for item in pending:
+                        if not item['task_id']:
+                            continue
+                        item['urls'] = capture.task_image_urls(item['task_id'])[:IMAGES_PER_GENERATION]
+                        if self.capture_mode == 'cdp':
+                            continue
+                        # As in generate_image, auto mode doesn't rely on the network responses alone
+                        if capture.task_failed(item['task_id']):
+                            print(f"✗ Dreamina reported batch item {item['index']} as failed; scanning the page instead")
+                            item['task_id'] = None
+                        elif not item['urls'] and time.monotonic() - item['submitted_at'] > item['schedule'].deadline / 2:
+                            print(f"⚠️ No images reported for batch item {item['index']}'s task yet; scanning the page instead")
+                            item['task_id'] = None
+                
+                if any(not item['task_id'] for item in pending):
+                    # Fallback for prompts without a task id: new page images in submission order
+                    claimed = set(capture.image_urls) if capture else set()
+                    try:
+                        snap = dom_probe.snapshot(driver, IMAGE_URL_MARKERS)
+                        new_urls = [url for url in snap['images'] if url not in seen_urls and url not in claimed]
+                    except Exception as e:
+                        print(f"Batch check error: {str(e)}")
+                        new_urls = []
+                    for url in new_urls:
+                        seen_urls.add(url)
+                        target = next((p for p in pending
+                                       if not p['task_id'] and len(p['urls']) < IMAGES_PER_GENERATION), None)
+                        if target is not None:
+                            target['urls'].append(url)
+                
+                finished = False
+                for item in list(pending):
+                    if len(item['urls']) >= IMAGES_PER_GENERATION:
+                        print(f"✓ Batch item {item['index']} finished with {len(item['urls'])} images")
+                        result = item_result(item, 'success')
+                    elif item['task_id'] and capture.task_failed(item['task_id']) and self.capture_mode == 'cdp':
+                        result = item_result(item, 'error', 'Dreamina reported the generation task as failed')
+                    elif item['schedule'].next_delay(time.monotonic() - item['submitted_at']) <= 0:
+                        result = item_result(item, 'error',
+                                             f"Only {len(item['urls'])} images generated after "
+                                             f"{item['schedule'].deadline}s (expected {IMAGES_PER_GENERATION})")
+                    else:
+                        continue
+                    pending.remove(item)
+                    finished = True
+                    yield result
+                
+                if finished or not block:
+                    return
+                now = time.monotonic()
+                time.sleep(min(item['schedule'].next_delay(now - item['submitted_at']) for item in pending))
+        
+        for index, spec in enumerate(specs):
+            while len(pending) >= max_in_flight:
+                yield from drain(block=True)
+            
+            print(f"Batch item {index + 1}/{len(specs)}: {spec['prompt'][:50]}")
+            item = {
+                'index': index,
+                'spec': spec,
+                'urls': [],
+                'task_id': None,
+                'schedule': PollSchedule.for_generation(self.duration_model, spec.get('model', 'image_4.0'),
+                                                        spec.get('aspect_ratio', '1:1')),
+                'submitted_at': time.monotonic()
+            }
+            known_tasks = len(capture.task_order) if capture else 0
+            try:
+                error = self._submit_prompt(spec['prompt'])
+            except Exception as e:
+                error = {'message': f'Image generation error: {str(e)}'}
+            if error:
+                yield item_result(item, 'error', error['message'])
+                continue
+            if capture:
+                item['task_id'] = self._await_task_id(capture, known_tasks)
+                if not item['task_id']:
+                    print(f"⚠️ No task id for batch item {index}; matching its images by submission order")
+            pending.append(item)
+            yield from drain(block=False)
+        
+        while pending:
+            yield from drain(block=True)
+        self.debug_store.finish(self.debug_request, 'success')
+    
+    def _await_task_id(self, capture, known, timeout=5):
+        """Task id from the submit response after the first `known` ones, or None if it doesn't arrive in time"""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                capture.poll()
+            except Exception as e:
+                print(f"Batch capture error: {str(e)}")
+                return None
+            if len(capture.task_order) > known:
+                return capture.task_order[known]
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(0.25)
+    
     def close(self):
         if self.driver:
             try:
@@ -712,6 +1058,11 @@ class DreaminaService:
             except:
                 pass
             self.driver = None
+            self.waits = None
+        if getattr(self, 'profile', None):
+            # Chrome has flushed the profile by now, so a logged-in copy can seed the next launch
+            self.profile.release(save=self.is_authenticated)
+            self.profile = None
     
     def __del__(self):
         self.close()
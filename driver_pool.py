@@ -0,0 +1,176 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dreamina_service import DreaminaService
+
+
+class PoolExhaustedError(Exception):
+    """Raised when no browser becomes available within the checkout timeout"""
+
+
+class _PoolEntry:
+    def __init__(self, service):
+        self.service = service
+        self.created_at = time.monotonic()
+        self.uses = 0
+
+
+class DriverPool:
+    """Bounded pool of long-lived, logged-in DreaminaService instances.
+
+    Services are created lazily on checkout (so gunicorn --preload never forks a
+    running Chrome), validated before being handed out, and recycled once they
+    exceed max_uses or max_age.
+    """
+
+    def __init__(self, size=None, max_uses=None, max_age=None, checkout_timeout=None, factory=DreaminaService):
+        self.size = max(1, size or int(os.environ.get('DRIVER_POOL_SIZE', 1)))
+        self.max_uses = max_uses or int(os.environ.get('DRIVER_POOL_MAX_USES', 50))
+        self.max_age = max_age or float(os.environ.get('DRIVER_POOL_MAX_AGE', 1800))
+        self.checkout_timeout = checkout_timeout or float(os.environ.get('DRIVER_POOL_CHECKOUT_TIMEOUT', 120))
+        self.factory = factory
+
+        self._cond = threading.Condition()
+        self._idle = []
+        self._in_use = {}
+        self._total = 0
+        self._closed = False
+        self._created = 0
+        self._recycled = 0
+
+    def _is_expired(self, entry):
+        if entry.uses >= self.max_uses:
+            return True
+        return time.monotonic() - entry.created_at >= self.max_age
+
+    def _discard(self, entry, reason):
+        print(f"♻️ Recycling browser ({reason}, uses={entry.uses})")
+        try:
+            entry.service.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._total -= 1
+            self._recycled += 1
+            self._cond.notify()
+
+    def _create_entry(self):
+        print(f"🚗 Starting pooled browser ({self._total}/{self.size})")
+        service = self.factory()
+        try:
+            service.check_authentication()
+        except Exception:
+            service.close()
+            raise
+        with self._cond:
+            self._created += 1
+        return _PoolEntry(service)
+
+    def checkout(self, timeout=None):
+        """Return a warm DreaminaService, creating one if the pool has room"""
+        wait_for = self.checkout_timeout if timeout is None else timeout
+        deadline = time.monotonic() + wait_for
+
+        while True:
+            entry = None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolExhaustedError("Browser pool is shut down")
+                    if self._idle:
+                        entry = self._idle.pop()
+                        break
+                    if self._total < self.size:
+                        self._total += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolExhaustedError(f"No browser available after {wait_for:.0f}s")
+                    self._cond.wait(remaining)
+
+            if entry is None:
+                try:
+                    entry = self._create_entry()
+                except Exception:
+                    with self._cond:
+                        self._total -= 1
+                        self._cond.notify()
+                    raise
+            elif self._is_expired(entry):
+                self._discard(entry, 'expired')
+                continue
+            elif not entry.service.is_healthy():
+                self._discard(entry, 'failed health check')
+                continue
+
+            entry.uses += 1
+            with self._cond:
+                self._in_use[id(entry.service)] = entry
+            return entry.service
+
+    def checkin(self, service, discard=False):
+        """Return a service to the pool, recycling it if it is broken or worn out"""
+        with self._cond:
+            entry = self._in_use.pop(id(service), None)
+        if entry is None:
+            return
+
+        if discard or self._closed:
+            self._discard(entry, 'discarded')
+        elif self._is_expired(entry):
+            self._discard(entry, 'expired')
+        else:
+            with self._cond:
+                self._idle.append(entry)
+                self._cond.notify()
+
+    @contextmanager
+    def lease(self, timeout=None):
+        """Context manager wrapping checkout/checkin"""
+        service = self.checkout(timeout)
+        ok = False
+        try:
+            yield service
+            ok = True
+        finally:
+            self.checkin(service, discard=not ok)
+
+    def probe_idle(self):
+        """Liveness-check the idle browsers without creating any; returns counts"""
+        with self._cond:
+            entries, self._idle = self._idle, []
+        kept = []
+        for entry in entries:
+            if self._is_expired(entry):
+                self._discard(entry, 'expired')
+            elif not entry.service.is_healthy():
+                self._discard(entry, 'failed health probe')
+            else:
+                kept.append(entry)
+        with self._cond:
+            self._idle.extend(kept)
+            self._cond.notify_all()
+        return {'checked': len(entries), 'healthy': len(kept)}
+
+    def stats(self):
+        with self._cond:
+            return {
+                'size': self.size,
+                'total': self._total,
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+                'created': self._created,
+                'recycled': self._recycled,
+                'max_uses': self.max_uses,
+                'max_age': self.max_age
+            }
+
+    def close(self):
+        """Close every idle browser; in-use ones are closed on checkin"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for entry in idle:
+            self._discard(entry, 'pool shutdown')
@@ -0,0 +1,117 @@
+import os
+import threading
+import time
+from collections import deque
+
+from session_store import SessionStore
+
+
+class HealthState:
+    """Login, generation and probe outcomes kept in memory so /api/health never touches Chrome"""
+
+    def __init__(self, window=None):
+        self.window = window or int(os.environ.get('HEALTH_GENERATION_WINDOW', 20))
+        self._lock = threading.Lock()
+        self._generations = deque(maxlen=self.window)
+        self.last_login = None
+        self.last_login_success_at = None
+        self.last_probe = None
+
+    def record_login(self, method, success):
+        now = time.time()
+        with self._lock:
+            self.last_login = {'method': method, 'success': success, 'at': now}
+            if success:
+                self.last_login_success_at = now
+
+    def record_generation(self, status):
+        with self._lock:
+            self._generations.append((time.time(), status == 'success'))
+
+    def record_probe(self, probe):
+        with self._lock:
+            self.last_probe = probe
+
+    @property
+    def authenticated(self):
+        """True/False from the most recent login attempt, None before the first one"""
+        with self._lock:
+            return self.last_login['success'] if self.last_login else None
+
+    def snapshot(self):
+        with self._lock:
+            outcomes = [ok for _, ok in self._generations]
+            return {
+                'authenticated': self.last_login['success'] if self.last_login else None,
+                'last_login': dict(self.last_login) if self.last_login else None,
+                'last_login_success_at': self.last_login_success_at,
+                'generations': {
+                    'recent': len(outcomes),
+                    'succeeded': sum(outcomes),
+                    'success_rate': round(sum(outcomes) / len(outcomes), 3) if outcomes else None,
+                    'last_at': self._generations[-1][0] if self._generations else None
+                },
+                'last_probe': dict(self.last_probe) if self.last_probe else None
+            }
+
+
+class HealthProber:
+    """Background thread that refreshes HealthState every interval seconds.
+
+    A probe only pings browsers that are already idle in the pool (one cheap
+    WebDriver call each) and reads the saved session's timestamp; it never
+    launches Chrome or logs in.
+    """
+
+    def __init__(self, state, pool, session_store=None, interval=None):
+        self.state = state
+        self.pool = pool
+        self.session_store = session_store or SessionStore()
+        self.interval = float(os.environ.get('HEALTH_PROBE_INTERVAL', 60)) if interval is None else interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def probe(self):
+        started = time.monotonic()
+        browsers = self.pool.probe_idle()
+        saved_at = self.session_store.saved_at()
+        session_age = time.time() - saved_at if saved_at else None
+        probe = {
+            'at': time.time(),
+            'browsers_checked': browsers['checked'],
+            'browsers_healthy': browsers['healthy'],
+            'session_saved_at': saved_at,
+            'session_valid': session_age is not None and session_age <= self.session_store.max_age,
+            'duration': round(time.monotonic() - started, 4)
+        }
+        self.state.record_probe(probe)
+        return probe
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.probe()
+            except Exception as e:
+                print(f"⚠️ Health probe failed: {str(e)[:80]}")
+
+    def start(self):
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name='health-prober', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+_default_state = None
+_default_lock = threading.Lock()
+
+
+def get_health_state():
+    """Process-wide HealthState that every DreaminaService reports into"""
+    global _default_state
+    with _default_lock:
+        if _default_state is None:
+            _default_state = HealthState()
+        return _default_state
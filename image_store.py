@@ -0,0 +1,219 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from single_flight import SingleFlight
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+CHUNK_SIZE = 64 * 1024
+
+
+class ImageNotFoundError(Exception):
+    """Raised for an image id that was never registered (or whose file was evicted and lost its URL)"""
+
+
+def image_id(url):
+    """Stable id for a generated image URL"""
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()[:32]
+
+
+class ImageStore:
+    """Size-bounded on-disk cache of generated images, evicted least recently used first.
+
+    Each image is downloaded once, streamed straight to disk through a pooled
+    requests.Session, and stored as <id> with a <id>.json sidecar holding the
+    source URL, content type and a content-hash ETag. The sidecar keeps the
+    cache usable after a restart and after the upstream URL expires.
+    """
+
+    def __init__(self, directory=None, max_bytes=None, prefetch_workers=None, timeout=None):
+        self.directory = directory or os.environ.get('IMAGE_CACHE_DIR', '/tmp/dreamina_images')
+        self.max_bytes = max_bytes or int(os.environ.get('IMAGE_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+        self.timeout = timeout or float(os.environ.get('IMAGE_FETCH_TIMEOUT', 30))
+        workers = prefetch_workers or int(os.environ.get('IMAGE_PREFETCH_WORKERS', 4))
+        os.makedirs(self.directory, exist_ok=True)
+
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers * 2)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._lock = threading.Lock()
+        self._urls = {}
+        # id -> size in bytes, least recently used first
+        self._files = OrderedDict()
+        self._bytes = 0
+        self._fetches = SingleFlight()
+        # Called with each evicted id, e.g. so derived files can be removed too
+        self._eviction_listeners = []
+        self._prefetcher = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-prefetch')
+        self.hits = 0
+        self.downloads = 0
+        self.evictions = 0
+        self._scan()
+
+    def _data_path(self, image_id):
+        return os.path.join(self.directory, image_id)
+
+    def _meta_path(self, image_id):
+        return os.path.join(self.directory, f'{image_id}.json')
+
+    def _scan(self):
+        """Rebuild the LRU index from files left by a previous run, oldest access first"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.startswith('.') or name.endswith('.json'):
+                continue
+            path = self._data_path(name)
+            if not os.path.exists(self._meta_path(name)):
+                os.remove(path)
+                continue
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, name, stat.st_size))
+        for _, name, size in sorted(entries):
+            self._files[name] = size
+            self._bytes += size
+        if entries:
+            print(f"🖼 Image cache: {len(entries)} files ({self._bytes // 1024} KB) in {self.directory}")
+
+    def _read_meta(self, image_id):
+        try:
+            with open(self._meta_path(image_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def register(self, url, prefetch=True):
+        """Remember url and return its id; the download starts in the background"""
+        key = image_id(url)
+        with self._lock:
+            self._urls[key] = url
+            cached = key in self._files
+        if prefetch and not cached:
+            self._prefetcher.submit(self._prefetch, key)
+        return key
+
+    def _prefetch(self, key):
+        try:
+            self.fetch(key)
+        except Exception as e:
+            print(f"⚠️ Image prefetch failed for {key}: {e}")
+
+    def fetch(self, key):
+        """Return (path, meta) for a cached image, downloading it first if needed"""
+        with self._lock:
+            if key in self._files:
+                self._files.move_to_end(key)
+                self.hits += 1
+                hit = True
+            else:
+                hit = False
+        if hit:
+            meta = self._read_meta(key)
+            if meta is not None:
+                try:
+                    os.utime(self._data_path(key))
+                    return self._data_path(key), meta
+                except OSError:
+                    pass
+            self._forget(key)
+
+        meta, _ = self._fetches.do(key, lambda: self._download(key))
+        return self._data_path(key), meta
+
+    def _download(self, key):
+        with self._lock:
+            url = self._urls.get(key)
+        if url is None:
+            meta = self._read_meta(key)
+            url = meta and meta.get('url')
+        if not url:
+            raise ImageNotFoundError(f'Unknown image id: {key}')
+
+        hasher = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.download-')
+        try:
+            with self.session.get(url, stream=True, timeout=self.timeout) as response:
+                response.raise_for_status()
+                content_type = response.headers.get('Content-Type', 'application/octet-stream').split(';')[0]
+                with os.fdopen(fd, 'wb') as f:
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        f.write(chunk)
+                        hasher.update(chunk)
+                        size += len(chunk)
+            meta = {'url': url, 'content_type': content_type, 'etag': hasher.hexdigest()[:32], 'size': size}
+            with open(self._meta_path(key), 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            os.replace(tmp_path, self._data_path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        with self._lock:
+            self._bytes += size - self._files.pop(key, 0)
+            self._files[key] = size
+            self.downloads += 1
+            evicted = self._evict()
+        print(f"📥 Cached image {key} ({size // 1024} KB)")
+        for evicted_key in evicted:
+            for listener in self._eviction_listeners:
+                try:
+                    listener(evicted_key)
+                except Exception as e:
+                    print(f"⚠️ Eviction listener failed for {evicted_key}: {e}")
+        return meta
+
+    def _evict(self):
+        """Drop least recently used files until the cache fits in max_bytes (lock held); returns the evicted ids"""
+        evicted = []
+        while self._bytes > self.max_bytes and len(self._files) > 1:
+            key, size = self._files.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+            for path in (self._data_path(key), self._meta_path(key)):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            evicted.append(key)
+        return evicted
+
+    def add_eviction_listener(self, listener):
+        self._eviction_listeners.append(listener)
+
+    def contains(self, key):
+        """Whether the image's file is in the cache right now"""
+        with self._lock:
+            return key in self._files
+
+    def _forget(self, key):
+        with self._lock:
+            size = self._files.pop(key, None)
+            if size is not None:
+                self._bytes -= size
+
+    def stats(self):
+        with self._lock:
+            return {
+                'files': len(self._files),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'downloads': self.downloads,
+                'evictions': self.evictions
+            }
+
+    def close(self):
+        self._prefetcher.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
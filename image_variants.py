@@ -0,0 +1,223 @@
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from PIL import Image, features
+
+FORMATS = {
+    'webp': ('WEBP', 'image/webp'),
+    'avif': ('AVIF', 'image/avif'),
+    'jpeg': ('JPEG', 'image/jpeg'),
+    'png': ('PNG', 'image/png')
+}
+
+DEFAULT_VARIANTS = 'thumb:256:webp,preview:1024:webp,full:0:avif'
+
+
+def parse_variants(spec):
+    """Parse "name:max_side:format,..." (max_side 0 keeps the original size)"""
+    variants = []
+    for part in (spec or '').split(','):
+        if not part.strip():
+            continue
+        name, size, fmt = [p.strip().lower() for p in part.split(':')]
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported image variant format: {fmt}")
+        if fmt == 'avif' and not features.check('avif'):
+            print(f"⚠️ Pillow was built without AVIF support, encoding variant {name} as WebP")
+            fmt = 'webp'
+        variants.append((name, int(size), fmt))
+    return variants
+
+
+def render_variants(source_path, out_dir, variants, quality):
+    """Encode every variant of one image; runs in a worker process.
+
+    Outputs are named after the hash of their bytes, so identical variants are
+    stored once and a file name never changes meaning.
+    """
+    rendered = {}
+    with Image.open(source_path) as original:
+        original.load()
+        for name, size, fmt in variants:
+            image = original.copy()
+            if size:
+                image.thumbnail((size, size), Image.LANCZOS)
+            if fmt == 'jpeg' and image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            elif image.mode not in ('RGB', 'RGBA', 'L'):
+                image = image.convert('RGBA')
+
+            buffer = io.BytesIO()
+            pil_format, content_type = FORMATS[fmt]
+            options = {} if fmt == 'png' else {'quality': quality}
+            image.save(buffer, pil_format, **options)
+            data = buffer.getvalue()
+
+            digest = hashlib.sha256(data).hexdigest()[:32]
+            filename = f"{digest}.{fmt}"
+            path = os.path.join(out_dir, filename)
+            if not os.path.exists(path):
+                fd, tmp_path = tempfile.mkstemp(dir=out_dir, prefix='.variant-')
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            rendered[name] = {
+                'file': filename,
+                'content_type': content_type,
+                'width': image.width,
+                'height': image.height,
+                'bytes': len(data)
+            }
+    return rendered
+
+
+class VariantPipeline:
+    """Post-processes cached images into resized / re-encoded variants.
+
+    Encoding happens in a separate process pool so it never holds the GIL of
+    the request threads. Each image's variants are recorded in a small
+    <image_id>.json manifest next to the content-addressed output files.
+    When the image store evicts an image, its manifest and variant files are
+    removed too, so the variant directory stays bounded by the image cache.
+    """
+
+    def __init__(self, image_store, directory=None, variants=None, workers=None, quality=None):
+        self.image_store = image_store
+        self.directory = directory or os.environ.get('IMAGE_VARIANT_DIR', '/tmp/dreamina_variants')
+        self.variants = parse_variants(os.environ.get('IMAGE_VARIANTS', DEFAULT_VARIANTS) if variants is None else variants)
+        self.workers = workers or int(os.environ.get('IMAGE_VARIANT_WORKERS', 1))
+        self.quality = quality or int(os.environ.get('IMAGE_VARIANT_QUALITY', 80))
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._pool = None
+        self._dispatcher = ThreadPoolExecutor(max_workers=self.workers * 2, thread_name_prefix='image-variants')
+        self.processed = 0
+        self.failed = 0
+        self.discarded = 0
+        image_store.add_eviction_listener(self.discard)
+        self._prune()
+
+    @property
+    def enabled(self):
+        return bool(self.variants)
+
+    @property
+    def names(self):
+        return [name for name, _, _ in self.variants]
+
+    def _process_pool(self):
+        # Created on first use and spawned, not forked, so workers never inherit Chrome or request threads
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def _manifest_path(self, image_id):
+        return os.path.join(self.directory, f'{image_id}.json')
+
+    def _prune(self):
+        """Discard variants left by a previous run for images the store no longer holds"""
+        for name in os.listdir(self.directory):
+            if name.endswith('.json') and not self.image_store.contains(name[:-len('.json')]):
+                self.discard(name[:-len('.json')])
+
+    def discard(self, image_id):
+        """Remove an image's manifest and variant files (called when the image store evicts it).
+
+        Variant files are content-addressed, so an identical variant of another
+        image goes too; _process and get() render it again when they find it
+        missing.
+        """
+        manifest = self.manifest(image_id)
+        paths = [self._manifest_path(image_id)]
+        if manifest:
+            paths += [os.path.join(self.directory, entry['file']) for entry in manifest.values()]
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        if manifest is not None:
+            self.discarded += 1
+
+    def _complete(self, manifest):
+        """Manifest lists every configured variant and all of their files exist"""
+        return manifest is not None and all(
+            name in manifest and os.path.exists(os.path.join(self.directory, manifest[name]['file']))
+            for name in self.names
+        )
+
+    def manifest(self, image_id):
+        try:
+            with open(self._manifest_path(image_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def submit(self, image_id):
+        """Queue variant generation for an image; returns a Future of its manifest"""
+        with self._lock:
+            future = self._pending.get(image_id)
+            if future is None:
+                future = self._dispatcher.submit(self._process, image_id)
+                self._pending[image_id] = future
+            return future
+
+    def _process(self, image_id):
+        try:
+            manifest = self.manifest(image_id)
+            if not self._complete(manifest):
+                path, _ = self.image_store.fetch(image_id)
+                manifest = self._process_pool().submit(
+                    render_variants, path, self.directory, self.variants, self.quality
+                ).result()
+                with open(self._manifest_path(image_id), 'w', encoding='utf-8') as f:
+                    json.dump(manifest, f)
+                self.processed += 1
+                saved = sum(v['bytes'] for v in manifest.values())
+                print(f"🧩 Rendered {len(manifest)} variants for image {image_id} ({saved // 1024} KB)")
+            return manifest
+        except Exception as e:
+            self.failed += 1
+            print(f"⚠️ Variant generation failed for {image_id}: {e}")
+            raise
+        finally:
+            with self._lock:
+                self._pending.pop(image_id, None)
+
+    def get(self, image_id, name, timeout=None):
+        """Return (path, entry) of one variant, rendering it first if needed; (None, None) if unknown"""
+        if name not in self.names:
+            return None, None
+        manifest = self.manifest(image_id)
+        if manifest is None or name not in manifest or not os.path.exists(
+                os.path.join(self.directory, manifest[name]['file'])):
+            timeout = float(os.environ.get('IMAGE_VARIANT_TIMEOUT', 60)) if timeout is None else timeout
+            manifest = self.submit(image_id).result(timeout=timeout)
+        entry = manifest.get(name)
+        if entry is None:
+            return None, None
+        return os.path.join(self.directory, entry['file']), entry
+
+    def stats(self):
+        with self._lock:
+            return {
+                'variants': [f"{name}:{size}:{fmt}" for name, size, fmt in self.variants],
+                'pending': len(self._pending),
+                'processed': self.processed,
+                'failed': self.failed,
+                'discarded': self.discarded
+            }
+
+    def close(self):
+        self._dispatcher.shutdown(wait=False, cancel_futures=True)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,125 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _iso(ts):
+    if ts is None:
+        return None
+    return time.strftime('%Y-%m-%d %H:%M:%S UTC', time.gmtime(ts))
+
+
+class Job:
+    def __init__(self, params, runner=None):
+        self.id = uuid.uuid4().hex
+        self.params = params
+        self.runner = runner
+        # Runners that produce several results publish them here while running
+        self.items = None
+        self.state = 'queued'
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.state in ('succeeded', 'failed')
+
+    def to_dict(self):
+        data = {
+            'id': self.id,
+            'state': self.state,
+            'params': self.params,
+            'created_at': _iso(self.created_at),
+            'started_at': _iso(self.started_at),
+            'finished_at': _iso(self.finished_at)
+        }
+        if self.items is not None and self.result is None:
+            data['items'] = list(self.items)
+        if self.result is not None:
+            data['result'] = self.result
+        if self.error is not None:
+            data['error'] = self.error
+        return data
+
+
+class JobManager:
+    """Runs generation jobs on a background executor and keeps their results for a while"""
+
+    def __init__(self, runner, max_workers=None, ttl=None):
+        self.runner = runner
+        self.ttl = ttl or float(os.environ.get('JOB_TTL', 3600))
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or 1, thread_name_prefix='job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, params, runner=None):
+        """Queue a job and return it immediately.
+
+        A custom runner is called as runner(job, **params) so it can publish
+        partial results on job.items.
+        """
+        self.gc()
+        job = Job(params, runner)
+        with self._lock:
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job)
+        return job
+
+    def completed(self, params, result):
+        """Record a job whose result is already known (a cache hit) without queueing it"""
+        self.gc()
+        job = Job(params)
+        job.result = result
+        job.started_at = job.finished_at = time.time()
+        job.state = 'succeeded' if result.get('status') == 'success' else 'failed'
+        with self._lock:
+            self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id):
+        self.gc()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job):
+        job.state = 'running'
+        job.started_at = time.time()
+        try:
+            if job.runner:
+                result = job.runner(job, **job.params)
+            else:
+                result = self.runner(**job.params)
+            job.result = result
+            # finished_at first: gc() and readers treat a final state as having a finish time
+            job.finished_at = time.time()
+            job.state = 'succeeded' if result.get('status') == 'success' else 'failed'
+        except Exception as e:
+            print(f"Job {job.id} failed: {str(e)}")
+            job.error = str(e)
+            job.finished_at = time.time()
+            job.state = 'failed'
+
+    def gc(self):
+        """Drop finished jobs older than the TTL"""
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.finished and job.finished_at is not None and job.finished_at < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+        return len(expired)
+
+    def stats(self):
+        with self._lock:
+            states = {}
+            for job in self._jobs.values():
+                states[job.state] = states.get(job.state, 0) + 1
+        return {'jobs': sum(states.values()), 'by_state': states, 'ttl': self.ttl}
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
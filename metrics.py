@@ -0,0 +1,183 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Generation stages take anywhere from tens of milliseconds (selector hits) to a minute (image waits)
+SECONDS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 15, 20, 30, 45, 60, 90, 120)
+COUNT_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """Monotonic counter, optionally split by labels"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(f'{self.name}_total', key, None, value) for key, value in sorted(self._values.items())]
+
+
+class Histogram:
+    """Cumulative-bucket histogram, optionally split by labels"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=SECONDS_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['counts'][i] += 1
+                    break
+            series['sum'] += value
+            series['count'] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the with-block, including when it raises"""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(time.monotonic() - started, **labels)
+
+    def samples(self):
+        result = []
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series['counts']):
+                    cumulative += count
+                    result.append((f'{self.name}_bucket', key, ('le', _format_value(bound)), cumulative))
+                result.append((f'{self.name}_sum', key, None, series['sum']))
+                result.append((f'{self.name}_count', key, None, series['count']))
+        return result
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Everything in the Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, key, extra, value in metric.samples():
+                lines.append(f'{name}{_format_labels(metric.labelnames, key, extra)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    'dreamina_stage_seconds',
+    'Time spent in each stage of driver start-up, login and generation',
+    ['stage']
+))
+STAGE_FAILURES = REGISTRY.register(Counter(
+    'dreamina_stage_failures',
+    'Stages that ended in an error',
+    ['stage']
+))
+SELECTOR_ATTEMPTS = REGISTRY.register(Counter(
+    'dreamina_selector_attempts',
+    'Fallback selector resolutions per step, by outcome (hit, miss, error)',
+    ['step', 'outcome']
+))
+SELECTOR_SECONDS = REGISTRY.register(Histogram(
+    'dreamina_selector_seconds',
+    'Time to resolve a step\'s fallback selectors',
+    ['step']
+))
+WAIT_SECONDS = REGISTRY.register(Histogram(
+    'dreamina_wait_seconds',
+    'Time spent in each named page-condition wait, by whether the condition was met',
+    ['condition', 'met']
+))
+POLL_ITERATIONS = REGISTRY.register(Histogram(
+    'dreamina_poll_iterations',
+    'Result checks made while waiting for one generation\'s images',
+    buckets=COUNT_BUCKETS
+))
+IMAGES_FOUND = REGISTRY.register(Histogram(
+    'dreamina_images_found',
+    'New result images found per generation',
+    buckets=COUNT_BUCKETS
+))
+GENERATIONS = REGISTRY.register(Counter(
+    'dreamina_generations',
+    'Finished generate_image calls by model and status',
+    ['model', 'status']
+))
+LOGINS = REGISTRY.register(Counter(
+    'dreamina_logins',
+    'Authentication attempts by method (session, email) and outcome',
+    ['method', 'outcome']
+))
+ADMISSION_REJECTIONS = REGISTRY.register(Counter(
+    'dreamina_admission_rejections',
+    'Generate requests refused with 429 by reason (queue_full, wait_too_long)',
+    ['reason']
+))
+
+
+@contextmanager
+def stage(name):
+    """Time a stage into STAGE_SECONDS and count it in STAGE_FAILURES if it raises"""
+    try:
+        with STAGE_SECONDS.time(stage=name):
+            yield
+    except Exception:
+        STAGE_FAILURES.inc(stage=name)
+        raise
+
+
+def render():
+    return REGISTRY.render()
@@ -0,0 +1,198 @@
+import json
+import os
+import time
+
+# Dreamina endpoints whose JSON carries generation status and result URLs
+DEFAULT_API_PATTERNS = [
+    '/mweb/v1/get_history',
+    '/mweb/v1/get_history_by_ids',
+    '/mweb/v1/aigc_draft/generate',
+]
+
+# The subset of those that submit a new generation and return its task id
+DEFAULT_SUBMIT_PATTERNS = [
+    '/mweb/v1/aigc_draft/generate',
+]
+
+# JSON keys whose string values are result image URLs
+DEFAULT_URL_KEYS = ['image_url', 'url']
+
+# Task status codes reported by the history API
+DONE_STATUSES = {50}
+FAILED_STATUSES = {30}
+
+# Seconds to keep retrying a body that couldn't be read (it may belong to a tab that isn't focused)
+UNREAD_TTL = 30
+
+
+def _split_env(name, default):
+    value = os.environ.get(name)
+    if not value:
+        return list(default)
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+class NetworkCapture:
+    """Reads Dreamina API responses from Chrome's performance log.
+
+    Requires the driver to be started with goog:loggingPrefs performance=ALL.
+    Result URLs and task status are taken straight from the JSON bodies, so
+    completion is seen as soon as the backend reports it. Only records for
+    task ids from a submit response count as results. URLs seen before the
+    first submit response (an older history feed) are only held in
+    early_urls, which is cleared once a task id arrives. URLs and statuses
+    are kept per task, so a batch with several generations in flight can
+    tell their results apart.
+
+    Network.getResponseBody only reaches the focused tab. A body that can't be
+    read yet is retried on later polls for up to UNREAD_TTL seconds, so with
+    several tabs each one polls while it has focus and reads its own
+    responses.
+    """
+
+    def __init__(self, driver, image_markers, api_patterns=None, url_keys=None):
+        self.driver = driver
+        self.image_markers = image_markers
+        self.api_patterns = api_patterns or _split_env('DREAMINA_CAPTURE_API_PATTERNS', DEFAULT_API_PATTERNS)
+        self.url_keys = set(url_keys or _split_env('DREAMINA_CAPTURE_URL_KEYS', DEFAULT_URL_KEYS))
+        self.submit_patterns = _split_env('DREAMINA_CAPTURE_SUBMIT_PATTERNS', DEFAULT_SUBMIT_PATTERNS)
+        self.task_ids = set()
+        self.task_order = []
+        self.task_urls = {}
+        self.task_status = {}
+        self.image_urls = []
+        self.early_urls = []
+        self.completed = False
+        self.failed = False
+        self.responses_seen = 0
+        self._pending = {}
+        self._unread = {}
+
+    def start(self):
+        """Enable network events and throw away everything logged so far"""
+        self.driver.execute_cdp_cmd('Network.enable', {})
+        self.driver.get_log('performance')
+        self.image_urls = []
+        self.early_urls = []
+        self.task_ids = set()
+        self.task_order = []
+        self.task_urls = {}
+        self.task_status = {}
+        self.completed = False
+        self.failed = False
+        self._pending = {}
+        self._unread = {}
+
+    def poll(self):
+        """Process new log entries; returns the number of API responses parsed"""
+        parsed = 0
+        for entry in self.driver.get_log('performance'):
+            try:
+                message = json.loads(entry['message'])['message']
+            except (KeyError, ValueError):
+                continue
+            method = message.get('method')
+            params = message.get('params', {})
+
+            if method == 'Network.responseReceived':
+                response = params.get('response', {})
+                url = response.get('url', '')
+                if 'json' in response.get('mimeType', '') and any(p in url for p in self.api_patterns):
+                    self._pending[params.get('requestId')] = url
+            elif method == 'Network.loadingFinished':
+                request_id = params.get('requestId')
+                if request_id in self._pending:
+                    self._unread[request_id] = (self._pending.pop(request_id), time.monotonic())
+            elif method == 'Network.loadingFailed':
+                self._pending.pop(params.get('requestId'), None)
+        for request_id, (url, finished_at) in list(self._unread.items()):
+            if self._ingest_body(request_id, url):
+                parsed += 1
+            elif time.monotonic() - finished_at < UNREAD_TTL:
+                continue
+            del self._unread[request_id]
+        self.responses_seen += parsed
+        return parsed
+
+    @property
+    def own_task_id(self):
+        """The first task submitted since start(); the one a single generation waits for"""
+        return self.task_order[0] if self.task_order else None
+
+    def task_image_urls(self, task_id, exclude=()):
+        return [url for url in self.task_urls.get(task_id, []) if url not in exclude]
+
+    def new_image_urls(self, exclude=()):
+        """Result URLs of own_task_id (none until the submit response has been seen)"""
+        return self.task_image_urls(self.own_task_id, exclude)
+
+    def task_failed(self, task_id):
+        return self.task_status.get(task_id) in FAILED_STATUSES
+
+    def wait(self, seconds, expected_count, exclude=(), interval=0.25):
+        """Poll the log for up to seconds, returning early once results are complete"""
+        deadline = time.monotonic() + seconds
+        while True:
+            self.poll()
+            if self.failed or self.completed or len(self.new_image_urls(exclude)) >= expected_count:
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(interval, remaining))
+
+    def _ingest_body(self, request_id, url):
+        try:
+            body = self.driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+            data = json.loads(body.get('body', ''))
+        except Exception:
+            return False
+        if any(p in url for p in self.submit_patterns):
+            self._collect_task_ids(data)
+        self._walk(data, None, in_task=not self.task_ids, task_id=None)
+        return True
+
+    def _collect_task_ids(self, node):
+        if isinstance(node, dict):
+            for key, child in node.items():
+                if key == 'history_record_id' and isinstance(child, (str, int)):
+                    if str(child) not in self.task_ids:
+                        self.task_ids.add(str(child))
+                        self.task_order.append(str(child))
+                        # Anything collected before we knew our task belongs to older generations
+                        self.early_urls = []
+                else:
+                    self._collect_task_ids(child)
+        elif isinstance(node, list):
+            for child in node:
+                self._collect_task_ids(child)
+
+    def _walk(self, node, key, in_task, task_id):
+        if isinstance(node, dict):
+            record_id = node.get('history_record_id')
+            if record_id is not None and self.task_ids:
+                in_task = str(record_id) in self.task_ids
+                task_id = str(record_id) if in_task else None
+                status = node.get('status')
+                if in_task and isinstance(status, int):
+                    self.task_status[task_id] = status
+                    if status in DONE_STATUSES:
+                        self.completed = True
+                    elif status in FAILED_STATUSES:
+                        self.failed = True
+            for child_key, child in node.items():
+                self._walk(child, child_key, in_task, task_id)
+        elif isinstance(node, list):
+            for child in node:
+                self._walk(child, key, in_task, task_id)
+        elif in_task and isinstance(node, str) and key in self.url_keys and node.startswith('http'):
+            if not any(marker in node for marker in self.image_markers):
+                return
+            if task_id is None:
+                if node not in self.early_urls:
+                    self.early_urls.append(node)
+                return
+            if node not in self.image_urls:
+                self.image_urls.append(node)
+            if node not in self.task_urls.setdefault(task_id, []):
+                self.task_urls[task_id].append(node)
@@ -0,0 +1,174 @@
+import fnmatch
+import os
+import threading
+
+# URL patterns for Network.setBlockedURLs ('*' is the only wildcard). Result
+# images always have to load, because Dreamina only fills in their src once
+# the image itself arrives.
+TRACKERS = [
+    '*google-analytics.com*',
+    '*googletagmanager.com*',
+    '*googleadservices.com*',
+    '*doubleclick.net*',
+    '*connect.facebook.net*',
+    '*facebook.com/tr*',
+    '*analytics.tiktok.com*',
+    '*hotjar.com*',
+    '*clarity.ms*',
+    '*sentry.io*',
+    '*segment.io*',
+    '*amplitude.com*',
+    '*mixpanel.com*'
+]
+
+FONTS = ['*.woff2', '*.woff2?*', '*.woff', '*.woff?*', '*.ttf', '*.ttf?*', '*.otf', '*.otf?*']
+
+MEDIA = ['*.mp4', '*.mp4?*', '*.webm', '*.webm?*', '*.m3u8', '*.m3u8?*', '*.mp3', '*.mp3?*']
+
+DECORATION = ['*.gif', '*.gif?*', '*.svg', '*.svg?*', '*.ico', '*.ico?*']
+
+RULE_SETS = {
+    'off': [],
+    'trackers': TRACKERS,
+    'balanced': TRACKERS + FONTS + MEDIA,
+    'aggressive': TRACKERS + FONTS + MEDIA + DECORATION
+}
+
+# Shapes of result image URLs; a deny pattern matching any of these would break result detection
+ALLOW_SAMPLE_PATHS = ('/tos/result.png', '/tos/result.jpeg', '/tos/result.webp', '/tos/result~tplv-x.image?x-expires=1')
+
+# Collected after each measured page load: navigation timing, bytes over the wire, JS heap
+PAGE_STATS_JS = """
+var nav = performance.getEntriesByType('navigation')[0];
+var resources = performance.getEntriesByType('resource');
+var bytes = nav ? nav.transferSize : 0;
+for (var i = 0; i < resources.length; i++) bytes += resources[i].transferSize || 0;
+return {
+    load_ms: nav && nav.loadEventEnd > 0 ? nav.loadEventEnd : null,
+    dom_content_loaded_ms: nav && nav.domContentLoadedEventEnd > 0 ? nav.domContentLoadedEventEnd : null,
+    transfer_bytes: bytes,
+    resources: resources.length
+};
+"""
+
+MEASURED_FIELDS = ('load_ms', 'dom_content_loaded_ms', 'transfer_bytes', 'resources', 'js_heap_bytes')
+
+
+def _split(value):
+    return [item.strip() for item in (value or '').split(',') if item.strip()]
+
+
+class ResourceBlocker:
+    """Blocks page resources the login/generation flows never use, per a named rule set.
+
+    Rule sets are deny lists of URL patterns applied with CDP
+    Network.setBlockedURLs. That call has no exceptions, so allow markers are
+    enforced up front: a deny pattern that would match a URL containing an
+    allowed marker (the result image hosts by default) is dropped with a
+    warning. Page loads are measured per rule set so their savings can be
+    compared against 'off'.
+    """
+
+    def __init__(self, rule_set=None, deny=None, allow=None):
+        name = (rule_set or os.environ.get('DREAMINA_BLOCK_RULES', 'balanced')).lower()
+        if name not in RULE_SETS:
+            print(f"Unknown DREAMINA_BLOCK_RULES '{name}', using 'balanced'")
+            name = 'balanced'
+        extra_deny = _split(os.environ.get('DREAMINA_BLOCK_DENY')) if deny is None else list(deny)
+        extra_allow = _split(os.environ.get('DREAMINA_BLOCK_ALLOW')) if allow is None else list(allow)
+        self.rule_set = f'{name}+custom' if extra_deny else name
+        # Imported here to avoid a cycle: dreamina_service imports this module
+        from dreamina_service import IMAGE_URL_MARKERS
+        self.allow = list(IMAGE_URL_MARKERS) + extra_allow
+        self.patterns = self._filter(RULE_SETS[name] + extra_deny)
+
+    def _filter(self, patterns):
+        samples = [f'https://cdn.{marker}{path}' for marker in self.allow for path in ALLOW_SAMPLE_PATHS]
+        kept = []
+        for pattern in dict.fromkeys(patterns):
+            hits = [url for url in samples if fnmatch.fnmatchcase(url, pattern)]
+            if hits:
+                print(f"⚠️ Not blocking '{pattern}': it would also block allowed URLs like {hits[0]}")
+            else:
+                kept.append(pattern)
+        return kept
+
+    def apply(self, driver):
+        """Install the rule set on the driver's current tab (call again for every new tab)"""
+        try:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': self.patterns})
+            driver.execute_cdp_cmd('Performance.enable', {})
+            if self.patterns:
+                print(f"🚧 Blocking {len(self.patterns)} URL patterns (rule set '{self.rule_set}')")
+        except Exception as e:
+            print(f"Could not apply resource blocking: {str(e)[:80]}")
+
+    def measure(self, driver, page):
+        """Record load time, transferred bytes and JS heap for the page that just loaded"""
+        try:
+            sample = driver.execute_script(PAGE_STATS_JS) or {}
+            perf = driver.execute_cdp_cmd('Performance.getMetrics', {}).get('metrics', [])
+            sample['js_heap_bytes'] = next((m['value'] for m in perf if m['name'] == 'JSHeapUsedSize'), None)
+        except Exception as e:
+            print(f"Could not measure page load: {str(e)[:80]}")
+            return None
+        page_loads.record(self.rule_set, page, sample)
+        return sample
+
+    def stats(self):
+        return dict(page_loads.report(), active=self.rule_set, patterns=self.patterns)
+
+
+class PageLoadStats:
+    """Running means of page-load samples keyed by (rule set, page), shared by every ResourceBlocker"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pages = {}
+
+    def record(self, rule_set, page, sample):
+        with self._lock:
+            totals = self._pages.setdefault((rule_set, page), {'loads': 0, 'sums': {}, 'counts': {}})
+            totals['loads'] += 1
+            for field in MEASURED_FIELDS:
+                if sample.get(field) is not None:
+                    totals['sums'][field] = totals['sums'].get(field, 0) + sample[field]
+                    totals['counts'][field] = totals['counts'].get(field, 0) + 1
+
+    def report(self):
+        """Mean page-load figures per rule set and page, with savings relative to 'off' where measured"""
+        with self._lock:
+            report = {}
+            for (rule_set, page), totals in self._pages.items():
+                means = {field: round(totals['sums'][field] / totals['counts'][field], 1)
+                         for field in totals['sums']}
+                report.setdefault(rule_set, {})[page] = dict(means, loads=totals['loads'])
+        baseline = report.get('off', {})
+        for rule_set, pages in report.items():
+            if rule_set == 'off':
+                continue
+            for page, means in pages.items():
+                base = baseline.get(page)
+                if not base:
+                    continue
+                means['savings_pct'] = {
+                    field: round(100 * (base[field] - means[field]) / base[field], 1)
+                    for field in MEASURED_FIELDS
+                    if base.get(field) and means.get(field) is not None
+                }
+        return {'rule_sets': report}
+
+
+page_loads = PageLoadStats()
+_default_blocker = None
+_lock = threading.Lock()
+
+
+def get_resource_blocker():
+    """Process-wide ResourceBlocker configured from the environment"""
+    global _default_blocker
+    with _lock:
+        if _default_blocker is None:
+            _default_blocker = ResourceBlocker()
+        return _default_blocker
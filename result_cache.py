@@ -0,0 +1,74 @@
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def make_key(prompt, model, aspect_ratio, quality):
+    """Normalize request parameters so trivially different prompts share an entry"""
+    return (
+        ' '.join(prompt.split()),
+        str(model).strip().lower(),
+        str(aspect_ratio).strip().lower(),
+        str(quality).strip().lower()
+    )
+
+
+class ResultCache:
+    """LRU + TTL cache of successful generation results"""
+
+    def __init__(self, max_entries=None, ttl=None):
+        self.max_entries = int(os.environ.get('RESULT_CACHE_SIZE', 256)) if max_entries is None else max_entries
+        self.ttl = float(os.environ.get('RESULT_CACHE_TTL', 3600)) if ttl is None else ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 and self.ttl > 0
+
+    def get(self, key):
+        """Return a copy of the cached result, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                self.evictions += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(entry[1])
+
+    def put(self, key, result):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), copy.deepcopy(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None
+            }
@@ -0,0 +1,82 @@
+from selenium.webdriver.common.by import By
+
+# Polls every candidate selector inside the page and calls back with the index and
+# element of the first one that matches (and is clickable), or null on timeout.
+# A fallback (non-first) match is held for graceMs so a preferred selector that
+# renders a moment later still wins.
+RESOLVE_JS = """
+var candidates = arguments[0], timeoutMs = arguments[1], clickable = arguments[2], graceMs = arguments[3];
+var done = arguments[arguments.length - 1];
+var started = performance.now();
+var fallbackSince = null;
+
+function find(kind, value) {
+    try {
+        if (kind === 'xpath') {
+            var snap = document.evaluate(value, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            var nodes = [];
+            for (var i = 0; i < snap.snapshotLength; i++) nodes.push(snap.snapshotItem(i));
+            return nodes;
+        }
+        return Array.prototype.slice.call(document.querySelectorAll(value));
+    } catch (e) {
+        return [];
+    }
+}
+
+function usable(el) {
+    if (!clickable) return true;
+    if (el.nodeType !== 1 || !el.getClientRects().length) return false;
+    var style = window.getComputedStyle(el);
+    return style.visibility !== 'hidden' && style.display !== 'none' && !el.disabled;
+}
+
+function best() {
+    for (var c = 0; c < candidates.length; c++) {
+        var nodes = find(candidates[c][0], candidates[c][1]);
+        for (var n = 0; n < nodes.length; n++) {
+            if (usable(nodes[n])) return [c, nodes[n]];
+        }
+    }
+    return null;
+}
+
+function tick() {
+    var now = performance.now();
+    var match = best();
+    if (match) {
+        if (match[0] === 0) return done(match);
+        if (fallbackSince === null) fallbackSince = now;
+        if (now - fallbackSince >= graceMs || now - started >= timeoutMs) return done(match);
+    } else if (now - started >= timeoutMs) {
+        return done(null);
+    }
+    setTimeout(tick, 100);
+}
+tick();
+"""
+
+_KINDS = {By.XPATH: 'xpath', By.CSS_SELECTOR: 'css'}
+
+
+def resolve_first(driver, selectors, timeout, clickable=True, grace=0.3):
+    """Evaluate all (By, value) selectors together and return (index, element).
+
+    The earliest selector in the list wins when several match at once, and a
+    fallback match is only accepted once it has been the best for grace
+    seconds. Returns (None, None) if nothing matched within timeout seconds;
+    the whole cascade costs at most one timeout instead of one per selector.
+    """
+    candidates = []
+    for by, value in selectors:
+        if by not in _KINDS:
+            raise ValueError(f"Unsupported selector type for in-page resolution: {by}")
+        candidates.append([_KINDS[by], value])
+
+    driver.set_script_timeout(timeout + 5)
+    result = driver.execute_async_script(
+        RESOLVE_JS, candidates, int(timeout * 1000), clickable, int(grace * 1000)
+    )
+    if not result:
+        return None, None
+    return result[0], result[1]
@@ -0,0 +1,95 @@
+import json
+import os
+import tempfile
+import threading
+
+
+class SelectorStats:
+    """Per-step selector hit counts and latencies, persisted to a small JSON file.
+
+    Used to put the historically best selector of each step first, so it wins
+    the in-page resolution immediately when Dreamina's markup shifts.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get('DREAMINA_SELECTOR_STATS_FILE', '/tmp/dreamina_selector_stats.json')
+        self._lock = threading.Lock()
+        self._steps = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable selector stats file {self.path}: {e}")
+            return {}
+
+    def _save(self):
+        directory = os.path.dirname(self.path) or '.'
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.selectors-')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self._steps, f, indent=1)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Could not save selector stats: {e}")
+
+    def _step(self, step):
+        return self._steps.setdefault(step, {'misses': 0, 'selectors': {}})
+
+    def record_hit(self, step, selector, latency):
+        with self._lock:
+            entry = self._step(step)['selectors'].setdefault(selector, {'hits': 0, 'total_latency': 0.0})
+            entry['hits'] += 1
+            entry['total_latency'] = round(entry['total_latency'] + latency, 3)
+            self._save()
+
+    def record_miss(self, step):
+        with self._lock:
+            self._step(step)['misses'] += 1
+            self._save()
+
+    def order(self, step, selectors):
+        """Return (By, value) selectors sorted best-first; unseen ones keep their place after"""
+        with self._lock:
+            seen = self._steps.get(step, {}).get('selectors', {})
+
+            def rank(item):
+                index, (_, value) = item
+                entry = seen.get(value)
+                if not entry or not entry['hits']:
+                    return (1, 0, 0, index)
+                return (0, -entry['hits'], entry['total_latency'] / entry['hits'], index)
+
+            return [selector for _, selector in sorted(enumerate(selectors), key=rank)]
+
+    def snapshot(self):
+        """Per-step stats with mean latencies, for inspection"""
+        with self._lock:
+            report = {}
+            for step, data in self._steps.items():
+                selectors = {}
+                for value, entry in data['selectors'].items():
+                    selectors[value] = {
+                        'hits': entry['hits'],
+                        'avg_latency': round(entry['total_latency'] / entry['hits'], 3) if entry['hits'] else None
+                    }
+                report[step] = {'misses': data['misses'], 'selectors': selectors}
+            return report
+
+
+_default_stats = None
+_default_lock = threading.Lock()
+
+
+def get_selector_stats():
+    """Process-wide SelectorStats shared by every DreaminaService"""
+    global _default_stats
+    with _default_lock:
+        if _default_stats is None:
+            _default_stats = SelectorStats()
+        return _default_stats
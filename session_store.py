@@ -0,0 +1,76 @@
+import json
+import os
+import tempfile
+import threading
+import time
+
+# One lock for the process: every DreaminaService shares the same file
+_file_lock = threading.Lock()
+
+
+class SessionStore:
+    """On-disk store for the authenticated Dreamina cookie jar and localStorage"""
+
+    def __init__(self, path=None, max_age=None):
+        self.path = path or os.environ.get('DREAMINA_SESSION_FILE', '/tmp/dreamina_session.json')
+        self.max_age = max_age or float(os.environ.get('DREAMINA_SESSION_MAX_AGE', 7 * 24 * 3600))
+
+    def load(self):
+        """Return the saved state, or None if it is missing, unreadable or too old"""
+        with _file_lock:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+            except FileNotFoundError:
+                return None
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable session file {self.path}: {e}")
+                return None
+
+        age = time.time() - state.get('saved_at', 0)
+        if age > self.max_age:
+            print(f"Saved session is {age / 3600:.1f}h old, ignoring it")
+            return None
+        if not state.get('cookies'):
+            return None
+        return state
+
+    def saved_at(self):
+        """Unix time the session was saved, or None if there is no readable session"""
+        with _file_lock:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    return json.load(f).get('saved_at')
+            except (OSError, ValueError):
+                return None
+
+    def save(self, cookies, local_storage, origin):
+        state = {
+            'saved_at': time.time(),
+            'origin': origin,
+            'cookies': cookies,
+            'local_storage': local_storage or {}
+        }
+        directory = os.path.dirname(self.path) or '.'
+        with _file_lock:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.session-')
+            try:
+                # Cookies are credentials: keep the file private
+                os.fchmod(fd, 0o600)
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(state, f)
+                os.replace(tmp_path, self.path)
+            except Exception:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+                raise
+
+    def clear(self):
+        with _file_lock:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
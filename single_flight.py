@@ -0,0 +1,70 @@
+import copy
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.duplicates = 0
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one execution"""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.duplicates = 0
+
+    def do(self, key, fn):
+        """Run fn once per key at a time; returns (result, shared).
+
+        Callers arriving while a call for key is in flight wait for it and get
+        a copy of its result (or its exception) with shared=True.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.duplicates += 1
+                self.duplicates += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.leaders += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result), True
+
+        try:
+            result = fn()
+            # Duplicates get their own copies of a snapshot the leader can't mutate
+            call.result = copy.deepcopy(result)
+            return result, False
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self, key):
+        """Whether a call for key is running now, so a new caller would join it"""
+        with self._lock:
+            return key in self._calls
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'leaders': self.leaders,
+                'duplicates': self.duplicates
+            }
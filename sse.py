@@ -0,0 +1,48 @@
+import json
+
+# Forwarded as they happen; the final 'done'/'error' is sent by finish() with the full API response
+PROGRESS_EVENTS = ('started', 'prompt_entered', 'image')
+
+# Comment frame that keeps proxies from closing a quiet stream
+KEEPALIVE = b': keep-alive\n\n'
+
+
+def format_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode('utf-8')
+
+
+class GenerationStream:
+    """Turns generate_image progress callbacks into Server-Sent Event frames.
+
+    The generation thread calls on_event()/finish(), which hand items to
+    `put` (a queue.Queue.put, or a loop.call_soon_threadsafe wrapper for
+    asyncio); the serving side passes each item it takes off that queue to
+    render(). Results that skip the browser (cache hits, coalesced requests)
+    have their images sent as 'image' events just before 'done'.
+    """
+
+    def __init__(self, put):
+        self._put = put
+        self._sent_urls = set()
+
+    def on_event(self, event, data):
+        if event in PROGRESS_EVENTS:
+            self._put((event, data))
+
+    def finish(self, result):
+        self._put((None, result))
+
+    def render(self, item):
+        """Return (frames, finished) for one queued item"""
+        event, data = item
+        if event is not None:
+            if event == 'image':
+                self._sent_urls.add(data['url'])
+            return [format_event(event, data)], False
+        frames = []
+        for url in data.get('images', []):
+            if url not in self._sent_urls:
+                frames.append(format_event('image', {'url': url, 'index': len(self._sent_urls)}))
+                self._sent_urls.add(url)
+        frames.append(format_event('done' if data.get('status') == 'success' else 'error', data))
+        return frames, True
@@ -0,0 +1,187 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+
+import dom_probe
+from adaptive_polling import PollSchedule
+from dreamina_service import IMAGE_URL_MARKERS, IMAGES_PER_GENERATION
+
+
+class TabScheduler:
+    """Runs generate_image-style flows concurrently in several tabs of one browser.
+
+    WebDriver can only drive the focused window, so every driver call goes
+    through focus(), which holds a lock and switches windows only when
+    needed. Tabs release the lock while they sleep between result checks,
+    which is where the concurrency comes from. Chrome is already started with
+    background timer/renderer throttling disabled, so unfocused tabs keep
+    rendering their results.
+
+    One NetworkCapture reads the API responses of every tab, and each tab
+    takes the task id from its own submit response, so results are matched to
+    their prompt rather than to whichever tab sees them first.
+    """
+
+    def __init__(self, service, tabs=2):
+        self.service = service
+        self.tab_count = max(1, tabs)
+        self._lock = threading.RLock()
+        self._focused = None
+        self._handles = []
+        self._free = queue.Queue()
+        self.capture = None
+        # Page-scan fallback: URLs already taken by some tab, in case a shared history feed shows them everywhere
+        self._claimed = set()
+
+    @contextmanager
+    def focus(self, handle):
+        """Hold the driver with handle's tab focused"""
+        with self._lock:
+            if self._focused != handle:
+                self.service.driver.switch_to.window(handle)
+                self._focused = handle
+            yield self.service.driver
+
+    def open(self):
+        """Log in once, then open the workspace in tab_count tabs"""
+        if not self.service.ensure_authenticated():
+            raise Exception('Authentication failed. Cannot generate image.')
+        driver = self.service.init_driver()
+        with self._lock:
+            self._handles = [driver.current_window_handle]
+            self._focused = self._handles[0]
+            for _ in range(self.tab_count - 1):
+                driver.switch_to.new_window('tab')
+                self.service.resource_blocker.apply(driver)
+                self._handles.append(driver.current_window_handle)
+                self._focused = self._handles[-1]
+            for handle in self._handles:
+                with self.focus(handle):
+                    if not self.service._open_authenticated_workspace():
+                        raise Exception('Session expired and re-authentication failed. Cannot generate image.')
+                    self._claimed.update(dom_probe.snapshot(driver, IMAGE_URL_MARKERS)['images'])
+            self.capture = self.service._start_capture()
+        for handle in self._handles:
+            self._free.put(handle)
+        print(f"🗂 Opened {len(self._handles)} workspace tabs")
+
+    def generate(self, prompt, aspect_ratio='1:1', quality='high', model='image_4.0'):
+        """Run one generation in the next free tab; same result shape as generate_image.
+
+        Results are matched by the task id from this tab's submit response. If
+        there is none (or, in auto mode, its task reports no images by half the
+        deadline) new page images are taken instead and returned with status
+        'unmatched', since another tab's results may be among them.
+        """
+        handle = self._free.get()
+        started = time.monotonic()
+        schedule = PollSchedule.for_generation(self.service.duration_model, model, aspect_ratio)
+        capture = self.capture
+        try:
+            with self.focus(handle) as driver:
+                existing = set(dom_probe.snapshot(driver, IMAGE_URL_MARKERS)['images'])
+                known_tasks = len(capture.task_order) if capture else 0
+                error = self.service._submit_prompt(prompt)
+                if error:
+                    return error
+                # Still holding the driver, so no other tab can submit before our task id is known
+                task_id = self.service._await_task_id(capture, known_tasks) if capture else None
+            if capture and not task_id:
+                print(f"⚠️ No task id for tab prompt: {prompt[:50]}; its images can't be told apart from other tabs'")
+
+            urls = []
+            while True:
+                elapsed = time.monotonic() - started
+                delay = schedule.next_delay(elapsed)
+                if delay <= 0:
+                    break
+                time.sleep(delay)
+                if task_id:
+                    with self.focus(handle):
+                        capture.poll()
+                        urls = capture.task_image_urls(task_id)[:IMAGES_PER_GENERATION]
+                        failed = capture.task_failed(task_id)
+                    if failed and self.service.capture_mode == 'cdp':
+                        break
+                    if self.service.capture_mode != 'cdp' and not urls and (
+                            failed or time.monotonic() - started > schedule.deadline / 2):
+                        print(f"⚠️ No images reported for tab prompt: {prompt[:50]}; scanning the page instead")
+                        task_id = None
+                if not task_id:
+                    with self.focus(handle) as driver:
+                        images = dom_probe.snapshot(driver, IMAGE_URL_MARKERS)['images']
+                    with self._lock:
+                        for url in images:
+                            if url not in existing and url not in self._claimed and len(urls) < IMAGES_PER_GENERATION:
+                                self._claimed.add(url)
+                                urls.append(url)
+                if len(urls) >= IMAGES_PER_GENERATION:
+                    break
+
+            elapsed = round(time.monotonic() - started)
+            if len(urls) >= IMAGES_PER_GENERATION:
+                result = {
+                    'status': 'success' if task_id else 'unmatched',
+                    'prompt': prompt,
+                    'model': model,
+                    'aspect_ratio': aspect_ratio,
+                    'quality': quality,
+                    'images': urls,
+                    'count': len(urls),
+                    'generation_time': f"{elapsed}s",
+                    'matched_by': 'task_id' if task_id else 'first_seen'
+                }
+                if not task_id:
+                    result['message'] = 'Images were taken from the page and may belong to another tab\'s prompt'
+                return result
+            return {
+                'status': 'error',
+                'message': f'Only {len(urls)} images generated after {elapsed}s (expected {IMAGES_PER_GENERATION})'
+            }
+        except Exception as e:
+            return {
+                'status': 'error',
+                'message': f'Image generation error: {str(e)}'
+            }
+        finally:
+            self._free.put(handle)
+
+    def generate_many(self, specs):
+        """Spread specs over the tabs; yields each result with its index as it finishes"""
+        with ThreadPoolExecutor(max_workers=len(self._handles), thread_name_prefix='tab') as executor:
+            futures = {
+                executor.submit(
+                    self.generate,
+                    spec['prompt'],
+                    spec.get('aspect_ratio', '1:1'),
+                    spec.get('quality', 'high'),
+                    spec.get('model', 'image_4.0')
+                ): index
+                for index, spec in enumerate(specs)
+            }
+            for future in as_completed(futures):
+                result = future.result()
+                result['index'] = futures[future]
+                if 'prompt' not in result:
+                    result['prompt'] = specs[futures[future]]['prompt']
+                yield result
+
+    def close(self):
+        """Close the extra tabs so the browser goes back to a single window"""
+        with self._lock:
+            driver = self.service.driver
+            for handle in self._handles[1:]:
+                try:
+                    driver.switch_to.window(handle)
+                    driver.close()
+                except Exception:
+                    pass
+            if self._handles and driver:
+                try:
+                    driver.switch_to.window(self._handles[0])
+                except Exception:
+                    pass
+            self._handles = []
+            self._focused = None
@@ -0,0 +1,135 @@
+import time
+import metrics
+from selenium.common.exceptions import (
+    JavascriptException,
+    NoSuchElementException,
+    StaleElementReferenceException,
+    TimeoutException,
+)
+
+# Installs a MutationObserver once per document and reports ms since the last DOM change
+DOM_QUIET_JS = """
+if (!window.__dreaminaMutations) {
+    window.__dreaminaMutations = {last: performance.now()};
+    new MutationObserver(function() {
+        window.__dreaminaMutations.last = performance.now();
+    }).observe(document.documentElement, {childList: true, subtree: true, attributes: true});
+}
+return performance.now() - window.__dreaminaMutations.last;
+"""
+
+# Ms since the most recent resource finished loading (0 if one finished just now)
+NETWORK_IDLE_JS = """
+var entries = performance.getEntriesByType('resource');
+var last = 0;
+for (var i = 0; i < entries.length; i++) {
+    if (entries[i].responseEnd > last) last = entries[i].responseEnd;
+}
+return performance.now() - last;
+"""
+
+
+def document_ready():
+    return lambda driver: driver.execute_script("return document.readyState") == 'complete'
+
+
+def url_changes(old_url):
+    return lambda driver: driver.current_url != old_url
+
+
+def element_enabled(locator):
+    """First matching element that is displayed and enabled"""
+    def condition(driver):
+        for element in driver.find_elements(*locator):
+            if element.is_displayed() and element.is_enabled():
+                return element
+        return None
+    return condition
+
+
+def element_gone(locator):
+    def condition(driver):
+        return not any(el.is_displayed() for el in driver.find_elements(*locator))
+    return condition
+
+
+def value_equals(element, value):
+    """The input reflects what we typed (front-end state has caught up)"""
+    return lambda driver: element.get_attribute('value') == value
+
+
+def dom_quiet(quiet_ms):
+    return lambda driver: driver.execute_script(DOM_QUIET_JS) >= quiet_ms
+
+
+def network_idle(idle_ms):
+    return lambda driver: driver.execute_script(NETWORK_IDLE_JS) >= idle_ms
+
+
+def all_of(*conditions):
+    def condition(driver):
+        result = True
+        for cond in conditions:
+            result = cond(driver)
+            if not result:
+                return False
+        return result
+    return condition
+
+
+def any_of(*conditions):
+    def condition(driver):
+        for cond in conditions:
+            result = cond(driver)
+            if result:
+                return result
+        return False
+    return condition
+
+
+class WaitEngine:
+    """Replaces fixed sleeps with readiness conditions and records how long each wait took"""
+
+    def __init__(self, driver, poll_interval=0.1):
+        self.driver = driver
+        self.poll_interval = poll_interval
+        self.records = []
+
+    def reset(self):
+        self.records = []
+
+    def until(self, name, condition, timeout, required=False):
+        """Poll condition until it returns something truthy or timeout seconds pass.
+
+        Returns the condition's value, or None on timeout (TimeoutException if
+        required=True).
+        """
+        start = time.monotonic()
+        result = None
+        while True:
+            try:
+                result = condition(self.driver)
+            except (StaleElementReferenceException, NoSuchElementException, JavascriptException):
+                result = None
+            elapsed = time.monotonic() - start
+            if result or elapsed >= timeout:
+                break
+            time.sleep(min(self.poll_interval, timeout - elapsed))
+
+        met = bool(result)
+        self.records.append({
+            'name': name,
+            'waited': round(elapsed, 3),
+            'timeout': timeout,
+            'met': met
+        })
+        print(f"  ⏱ {name}: {'ready' if met else 'timed out'} after {elapsed:.2f}s")
+        metrics.WAIT_SECONDS.observe(elapsed, condition=name, met=str(met).lower())
+        if not met:
+            if required:
+                raise TimeoutException(f"Timed out after {timeout}s waiting for: {name}")
+            return None
+        return result
+
+    def total_waited(self):
+        return round(sum(r['waited'] for r in self.records), 3)